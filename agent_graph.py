@@ -1,167 +1,394 @@
 import os
+import json
+import uuid
+import asyncio
 import datetime
+import hashlib
+from functools import lru_cache
+from typing import Callable, Dict
 from langgraph.graph import StateGraph, END
-from langchain_openai import ChatOpenAI
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.messages import HumanMessage, AIMessage, ToolMessage
+from langgraph.types import CachePolicy
+from langgraph.cache.memory import InMemoryCache
+from langgraph.cache.redis import RedisCache
+from langchain_core.messages import HumanMessage, AIMessage, SystemMessage, ToolMessage, message_chunk_to_message
+from langchain_core.messages.utils import trim_messages, count_tokens_approximately
+from langchain_core.utils.function_calling import convert_to_openai_tool
 # FIX: ToolInvocation and ToolExecutor are removed, relying on manual message handling
 from dotenv import load_dotenv
 
 # Import our custom components
 from models.state import GraphState
 from models.budget import Budget
-from database_tools import FINANCIAL_TOOLS
+from database_tools import FINANCIAL_TOOLS, WRITE_TOOLS
+from cache import get_redis_binary_client, ensure_semantic_cache_index, semantic_cache_lookup, semantic_cache_store
 # Ensure specific tool functions are imported here if needed, but not necessary for this approach.
 
-# Load environment variables
+# Load environment variables (ChatOpenAI reads OPENAI_API_KEY from the environment)
 load_dotenv()
-os.environ["OPENAI_API_KEY"] = os.getenv("OPENAI_API_KEY") 
 
 # --- 1. Initialize Core Components ---
-LLM = ChatOpenAI(model="gpt-4o-mini", temperature=0)
+# The chat model, embeddings and compiled graph are built on first use (see get_app),
+# so importing this module stays cheap for workers, tests and autoreload.
+
+
+class SemanticLLMCache:
+    """
+    Semantic response cache in front of the planner LLM.
+
+    Embeds the user's latest message and looks for a near-duplicate prompt
+    (cosine distance < max_distance) previously answered in the same thread.
+    Only plain answers are cached: turns that request tools mutate state or
+    depend on fresh data, so they always go to the LLM.
+
+    Hits are also scoped by cache_context(): the date and the message the
+    prompt replies to, so "yes" is only reused after the same question.
+    History further back is deliberately not part of the key; a plain answer
+    that depends on it can be served again for up to the entry's TTL (one day).
+    """
+
+    def __init__(self, embeddings, max_distance: float = 0.08):
+        self.embeddings = embeddings
+        self.max_distance = max_distance
+
+    @staticmethod
+    def cacheable_prompt(messages):
+        """Returns the prompt text if this is the first planner call of a turn, else None."""
+        if messages and isinstance(messages[-1], HumanMessage):
+            return messages[-1].content
+        return None
+
+    @staticmethod
+    def cache_context(messages) -> str:
+        """Digest of today's date and the message before the prompt, the scope a hit must share."""
+        previous = messages[-2].content if len(messages) > 1 else ""
+        payload = f"{datetime.date.today().isoformat()}\0{previous}"
+        return hashlib.sha1(payload.encode()).hexdigest()
+
+    async def embed(self, text: str):
+        """
+        Embeds the prompt, or returns None when the vector index or the embeddings API is
+        unavailable; the index is checked first so a cache that can't work costs no API call.
+        """
+        if not await asyncio.to_thread(ensure_semantic_cache_index):
+            return None
+        try:
+            return await self.embeddings.aembed_query(text)
+        except Exception as e:
+            print(f"Semantic cache embedding failed: {e}")
+            return None
+
+    async def lookup(self, thread_id: str, context: str, vector):
+        """Returns a cached AIMessage for a similar prompt, or None on a miss."""
+        cached = await asyncio.to_thread(semantic_cache_lookup, thread_id, context, vector, self.max_distance)
+        return AIMessage(content=cached) if cached is not None else None
+
+    async def store(self, thread_id: str, context: str, prompt: str, vector, response):
+        """Caches the response if it is a plain answer (no tool calls)."""
+        if not response.tool_calls and response.content:
+            await asyncio.to_thread(semantic_cache_store, thread_id, context, prompt, vector, response.content)
+
+
+@lru_cache(maxsize=1)
+def get_semantic_cache() -> SemanticLLMCache:
+    """Returns the shared semantic cache, creating its embeddings client on first use."""
+    from langchain_openai import OpenAIEmbeddings
+    return SemanticLLMCache(OpenAIEmbeddings(model="text-embedding-3-small"))
+
+
+# OpenAI function-call schemas for the tools, generated once at import
+PRECOMPUTED_TOOLS_JSON = [convert_to_openai_tool(tool) for tool in FINANCIAL_TOOLS]
+
+
+@lru_cache(maxsize=1)
+def get_model_with_tools():
+    """
+    Returns the planner LLM with the precomputed tool schemas bound.
+
+    Binding the ready-made JSON skips bind_tools' per-tool Pydantic schema generation.
+    """
+    from langchain_openai import ChatOpenAI
+    llm = ChatOpenAI(model="gpt-4o-mini", temperature=0)
+    return llm.bind(tools=PRECOMPUTED_TOOLS_JSON, tool_choice="auto")
+
+# Tool name -> implementation, for O(1) dispatch in the executor node
+TOOL_REGISTRY: Dict[str, Callable] = {tool.name: tool.func for tool in FINANCIAL_TOOLS}
+
+# System prompt with recurring expense instructions (formatted per turn with thread_id and date)
+SYSTEM_PROMPT_TEMPLATE = (
+    "You are a helpful financial assistant named Kean's MakwentaBot. "
+    "Today's date is {current_date}. "
+    "Your thread_id is {thread_id}. "
+    "You have tools to record expenses, check budgets, retrieve past reports, set new budgets, create saving goals, and manage recurring expenses. "
+    "\n"
+    "TOOL USAGE INSTRUCTIONS:\n"
+    "1. If the user says 'Set my weekly budget to 5000', use 'set_my_budget' with amount=5000 and period='weekly'. "
+    "\n"
+    "2. If the user wants to record a transaction, use 'record_transaction', then ALWAYS follow up with 'check_budget'. "
+    "IMPORTANT: If the user mentions a relative date when recording (e.g., 'I spent 50 yesterday', 'I paid 100 last Friday'), "
+    "calculate the correct 'YYYY-MM-DD' date and pass it as the 'expense_date' parameter. "
+    "Example: 'I spent 50 yesterday' → record_transaction(amount=50, expense_date='2025-12-28'). "
+    "\n"
+    "3. If the user asks for expenses on a specific day (e.g., 'yesterday', 'last Friday', 'Dec 3'), "
+    "calculate the correct 'YYYY-MM-DD' date relative to today's date. "
+    "\n"
+    "4. If user says 'I want to save 50k for a car by Dec 2026', use 'set_financial_goal'. "
+    "(Convert relative dates like 'next year' to YYYY-MM-DD). "
+    "\n"
+    "5. If user asks 'How are my goals?', use 'check_goals'. "
+    "\n"
+    "6. RECURRING EXPENSES:\n"
+    "   - CREATE: If user mentions 'recurring', 'subscription', 'every month/week', or 'monthly/weekly payment':\n"
+    "     Examples: 'My rent is 15000 monthly' OR 'I have a 2100 gym subscription every month'\n"
+    "     → ALWAYS use 'add_recurring_expense' with frequency='monthly' (NOT record_transaction)\n"
+    "   - VIEW: 'Show my subscriptions' or 'What recurring expenses do I have?' → use 'view_recurring_expenses'\n"
+    "   - EDIT: 'Change my Netflix subscription to 500' → use 'edit_recurring_expense' (need recurring_id from view)\n"
+    "   - PAUSE: 'Pause my gym membership' → use 'pause_recurring_expense'\n"
+    "   - RESUME: 'Resume my gym membership' → use 'resume_recurring_expense'\n"
+    "   - DELETE: 'Delete my Netflix subscription' → use 'delete_recurring_expense'\n"
+    "   - FORECAST: 'What recurring expenses do I have next month?' → use 'forecast_recurring_expenses' with days=30\n"
+    "\n"
+    "7. AUTO-PROCESSED TRANSACTIONS: If you see a [SYSTEM] message about auto-processed expenses, "
+    "IMMEDIATELY use 'check_budget' and inform the user about the automated recordings.\n"
+    "\n"
+    "8. BUDGET EXPLANATIONS: When the user asks WHY they are over/under budget, or asks to 'explain' their spending:\n"
+    "   → ALWAYS use 'get_expenses_by_date' with today's date to show the detailed breakdown.\n"
+    "   → List each expense clearly with amount, category, and description.\n"
+    "   → Example: If user asks 'Why am I over budget?', call get_expenses_by_date first, then explain.\n"
+    "\n"
+    "9. WEEKLY BREAKDOWNS: When the user asks for weekly expenses, breakdown, or 'this week':\n"
+    "   → ALWAYS use 'get_weekly_breakdown' tool.\n"
+    "   → Calculate the Monday of the current week (weeks start on Monday, not Sunday!).\n"
+    "   → IMPORTANT: If today IS Monday, then the current week started TODAY (not last Monday).\n"
+    "   → Example 1: If today is Saturday Dec 27, 2025, the current week started Monday Dec 22, 2025.\n"
+    "   → Example 2: If today is Monday Dec 29, 2025, the current week started TODAY (Dec 29, 2025).\n"
+    "   → The tool will show all 7 days (Mon-Sun) with totals and OVER indicators.\n"
+    "\n"
+    "Do NOT invent data. If the tool returns 'No expenses found', tell the user exactly that."
+)
+
+
+@lru_cache(maxsize=1024)
+def build_system_message(thread_id: str, today: datetime.date) -> SystemMessage:
+    """
+    Builds the planner's SystemMessage; cached per user per day.
+
+    The message is passed to the model as-is alongside the history, so no
+    prompt template parsing or re-validation happens per turn.
+    """
+    return SystemMessage(content=SYSTEM_PROMPT_TEMPLATE.format(
+        thread_id=thread_id,
+        current_date=today.strftime("%Y-%m-%d"),
+    ))
+
+# Token budget for the conversation history sent to the planner (system prompt excluded)
+HISTORY_MAX_TOKENS = 4000
+# Appended to a tool result cut down to fit that budget (see _shrink_tool_results)
+TOOL_RESULT_TRUNCATED = "\n[...truncated]"
+
+
+def _latest_turn(messages):
+    """Returns the messages from the last HumanMessage on (the whole list if there is none)."""
+    for index in range(len(messages) - 1, -1, -1):
+        if isinstance(messages[index], HumanMessage):
+            return messages[index:]
+    return messages
+
+
+def _shrink_tool_results(turn):
+    """
+    Truncates the turn's ToolMessage contents so the turn fits in HISTORY_MAX_TOKENS.
+
+    The remaining budget is split evenly over the tool results and converted at
+    ~4 characters per token (count_tokens_approximately's ratio). Copies are
+    returned; the messages in the graph state are left untouched.
+    """
+    tool_indexes = [i for i, m in enumerate(turn) if isinstance(m, ToolMessage)]
+    if not tool_indexes:
+        return turn
+    others = count_tokens_approximately([m for m in turn if not isinstance(m, ToolMessage)])
+    per_tool_chars = max(HISTORY_MAX_TOKENS - others, 0) // len(tool_indexes) * 4
+    shrunk = list(turn)
+    for i in tool_indexes:
+        content = str(shrunk[i].content)
+        if len(content) > per_tool_chars:
+            shrunk[i] = shrunk[i].model_copy(
+                update={"content": content[:per_tool_chars] + TOOL_RESULT_TRUNCATED}
+            )
+    return shrunk
+
+
+def window_history(messages):
+    """
+    Keeps the most recent messages that fit in HISTORY_MAX_TOKENS.
+
+    The window always starts on a HumanMessage, so a ToolMessage is never
+    sent without the AIMessage that requested it. The graph state itself
+    keeps the full history; only the LLM input is trimmed.
+
+    If even the latest turn alone is over budget, only that turn is sent,
+    with its tool results truncated to fit.
+    """
+    trimmed = trim_messages(
+        messages,
+        max_tokens=HISTORY_MAX_TOKENS,
+        strategy="last",
+        token_counter=count_tokens_approximately,
+        start_on="human",
+    )
+    if trimmed:
+        return trimmed
+    # A single oversized turn trims to nothing: keep just that turn, shrinking big tool results
+    return _shrink_tool_results(_latest_turn(messages))
 
 # --- 2. Define Custom Nodes ---
 
-def call_model(state: GraphState):
+async def call_model(state: GraphState):
     """NODE 1: The Planner. Calls the LLM to decide the next action."""
     
     messages = state['messages']
     thread_id = state['thread_id']
-    current_date = datetime.date.today().strftime("%Y-%m-%d")
-    
-    # System prompt with recurring expense instructions
-    system_prompt = (
-        f"You are a helpful financial assistant named Kean's MakwentaBot. "
-        f"Today's date is {current_date}. "
-        f"Your thread_id is {thread_id}. "
-        "You have tools to record expenses, check budgets, retrieve past reports, set new budgets, create saving goals, and manage recurring expenses. "
-        "\n"
-        "TOOL USAGE INSTRUCTIONS:\n"
-        "1. If the user says 'Set my weekly budget to 5000', use 'set_my_budget' with amount=5000 and period='weekly'. "
-        "\n"
-        "2. If the user wants to record a transaction, use 'record_transaction', then ALWAYS follow up with 'check_budget'. "
-        "IMPORTANT: If the user mentions a relative date when recording (e.g., 'I spent 50 yesterday', 'I paid 100 last Friday'), "
-        "calculate the correct 'YYYY-MM-DD' date and pass it as the 'expense_date' parameter. "
-        "Example: 'I spent 50 yesterday' → record_transaction(amount=50, expense_date='2025-12-28'). "
-        "\n"
-        "3. If the user asks for expenses on a specific day (e.g., 'yesterday', 'last Friday', 'Dec 3'), "
-        "calculate the correct 'YYYY-MM-DD' date relative to today's date. "
-        "\n"
-        "4. If user says 'I want to save 50k for a car by Dec 2026', use 'set_financial_goal'. "
-        "(Convert relative dates like 'next year' to YYYY-MM-DD). "
-        "\n"
-        "5. If user asks 'How are my goals?', use 'check_goals'. "
-        "\n"
-        "6. RECURRING EXPENSES:\n"
-        "   - CREATE: If user mentions 'recurring', 'subscription', 'every month/week', or 'monthly/weekly payment':\n"
-        "     Examples: 'My rent is 15000 monthly' OR 'I have a 2100 gym subscription every month'\n"
-        "     → ALWAYS use 'add_recurring_expense' with frequency='monthly' (NOT record_transaction)\n"
-        "   - VIEW: 'Show my subscriptions' or 'What recurring expenses do I have?' → use 'view_recurring_expenses'\n"
-        "   - EDIT: 'Change my Netflix subscription to 500' → use 'edit_recurring_expense' (need recurring_id from view)\n"
-        "   - PAUSE: 'Pause my gym membership' → use 'pause_recurring_expense'\n"
-        "   - RESUME: 'Resume my gym membership' → use 'resume_recurring_expense'\n"
-        "   - DELETE: 'Delete my Netflix subscription' → use 'delete_recurring_expense'\n"
-        "   - FORECAST: 'What recurring expenses do I have next month?' → use 'forecast_recurring_expenses' with days=30\n"
-        "\n"
-        "7. AUTO-PROCESSED TRANSACTIONS: If you see a [SYSTEM] message about auto-processed expenses, "
-        "IMMEDIATELY use 'check_budget' and inform the user about the automated recordings.\n"
-        "\n"
-        "8. BUDGET EXPLANATIONS: When the user asks WHY they are over/under budget, or asks to 'explain' their spending:\n"
-        "   → ALWAYS use 'get_expenses_by_date' with today's date to show the detailed breakdown.\n"
-        "   → List each expense clearly with amount, category, and description.\n"
-        "   → Example: If user asks 'Why am I over budget?', call get_expenses_by_date first, then explain.\n"
-        "\n"
-        "9. WEEKLY BREAKDOWNS: When the user asks for weekly expenses, breakdown, or 'this week':\n"
-        "   → ALWAYS use 'get_weekly_breakdown' tool.\n"
-        "   → Calculate the Monday of the current week (weeks start on Monday, not Sunday!).\n"
-        "   → IMPORTANT: If today IS Monday, then the current week started TODAY (not last Monday).\n"
-        "   → Example 1: If today is Saturday Dec 27, 2025, the current week started Monday Dec 22, 2025.\n"
-        "   → Example 2: If today is Monday Dec 29, 2025, the current week started TODAY (Dec 29, 2025).\n"
-        "   → The tool will show all 7 days (Mon-Sun) with totals and OVER indicators.\n"
-        "\n"
-        "Do NOT invent data. If the tool returns 'No expenses found', tell the user exactly that."
-    )
-    
-    prompt = ChatPromptTemplate.from_messages([
-        ("system", system_prompt),
-        *messages
-    ])
-    
-    model_with_tools = LLM.bind_tools(FINANCIAL_TOOLS)
-    response = model_with_tools.invoke(prompt.format_messages(messages=messages))
+
+    # Serve repeated questions from the semantic cache before paying for an LLM call
+    semantic_cache = get_semantic_cache()
+    prompt_text = semantic_cache.cacheable_prompt(messages)
+    vector = await semantic_cache.embed(prompt_text) if prompt_text else None
+    if vector is not None:
+        cache_context = semantic_cache.cache_context(messages)
+        cached_response = await semantic_cache.lookup(thread_id, cache_context, vector)
+        if cached_response is not None:
+            return {"messages": [cached_response]}
+
+    input_messages = [build_system_message(thread_id, datetime.date.today()), *window_history(messages)]
+
+    # Stream the completion so graph consumers using stream_mode="messages" get tokens
+    # as they are generated; the chunks are merged into one message for the state
+    model = get_model_with_tools()
+    response = None
+    async for chunk in model.astream(input_messages):
+        response = chunk if response is None else response + chunk
+    if response is None:
+        # The stream ended without a chunk (closed early by the provider): ask once more, unstreamed
+        response = await model.ainvoke(input_messages)
+    else:
+        response = message_chunk_to_message(response)
+
+    if vector is not None:
+        await semantic_cache.store(thread_id, cache_context, prompt_text, vector, response)
 
     # Return the LLM's response (which may contain tool calls)
     return {"messages": [response]}
 
-def call_tool_executor(state: GraphState):
-    """NODE 2: The Executor. Manually executes the tool calls requested by the LLM."""
-    last_message = state['messages'][-1]
-    tool_calls = last_message.tool_calls
+async def call_tool_executor(state: GraphState):
+    """
+    NODE 2: The Executor. Manually executes the tool calls requested by the LLM.
+
+    Independent tool calls are dispatched concurrently; each sync tool runs in a
+    worker thread so blocking DB calls never stall the event loop.
+    """
+    tool_calls = state['messages'][-1].tool_calls
     
-    tool_messages = []
+    pending_calls = []
+    coros = []
     
     for call in tool_calls:
         tool_name = call.get("name")
-        tool_args = call.get("args", {}).copy()
 
-        # Inject state data into tool calls (always override user_id for security)
-        # This ensures the user_id from state takes precedence over any LLM-provided value
-        tool_args['user_id'] = state['thread_id']
+        # Find the tool function (tool.func is the undecorated implementation)
+        tool_func = TOOL_REGISTRY.get(tool_name)
 
-        # Only inject current_budget for tools that need it
-        if tool_name == "get_daily_summary":
-            tool_args['current_budget'] = state['budget']
-        
-        # Find and execute the tool (We must use the tool.func attribute from the list)
-        tool_func = None
-        for tool in FINANCIAL_TOOLS:
-            if tool.name == tool_name:
-                tool_func = tool.func
-                break
-        
         if tool_func:
-            try:
-                # Execute the function with the prepared arguments
-                result = tool_func(**tool_args)
-                
-                # Append the ToolMessage (Observation) to the list
-                tool_messages.append(
-                    ToolMessage(
-                        content=str(result),
-                        tool_call_id=call["id"], # Crucial link back to the AIMessage
-                        name=tool_name
-                    )
-                )
-            except Exception as e:
-                # Handle execution errors
-                tool_messages.append(
-                    ToolMessage(
-                        content=f"Error executing {tool_name}: {str(e)}",
-                        tool_call_id=call["id"],
-                        name=tool_name
-                    )
-                )
+            # Inject state data into tool calls in one dict build (user_id always overrides
+            # any LLM-provided value for security; current_budget only for tools that need it)
+            tool_args = {**(call.get("args") or {}), "user_id": state['thread_id']}
+            if tool_name == "get_daily_summary":
+                tool_args['current_budget'] = state['budget']
+
+            pending_calls.append(call)
+            coros.append(asyncio.to_thread(tool_func, **tool_args))
+
+    # Execute all tool calls concurrently; exceptions are returned, not raised
+    results = await asyncio.gather(*coros, return_exceptions=True)
+
+    tool_messages = []
+    for call, result in zip(pending_calls, results):
+        tool_name = call["name"]
+        if isinstance(result, Exception):
+            # Handle execution errors
+            content = f"Error executing {tool_name}: {str(result)}"
+        else:
+            content = str(result)
+
+        # Append the ToolMessage (Observation) to the list
+        tool_messages.append(
+            ToolMessage(
+                content=content,
+                tool_call_id=call["id"], # Crucial link back to the AIMessage
+                name=tool_name
+            )
+        )
         
     # Return ONLY the ToolMessages (Observations) to be added to the state. 
     # The original AIMessage (Request) is already in the state history.
     return {"messages": tool_messages}
 
+# --- 2b. Planner Node Cache ---
+
+# Tools that write to the database; once one has run, the turn must not be replayed
+SIDE_EFFECT_TOOLS = frozenset(tool.name for tool in WRITE_TOOLS)
+PLANNER_CACHE_TTL = 3600  # seconds
+
+
+def planner_cache_key(state: GraphState) -> str:
+    """
+    Builds the planner cache key from the thread, date and message history.
+
+    The LLM runs at temperature=0, so identical inputs give identical outputs.
+    Message ids are excluded because they are regenerated on every turn.
+    Histories containing a side-effecting tool call get a unique key, which
+    makes them always miss.
+    """
+    messages = state['messages']
+    for message in messages:
+        for call in getattr(message, 'tool_calls', None) or ():
+            if call.get("name") in SIDE_EFFECT_TOOLS:
+                return uuid.uuid4().hex
+
+    payload = json.dumps(
+        {
+            "thread_id": state['thread_id'],
+            "date": datetime.date.today().isoformat(),
+            "messages": [m.model_dump(exclude={"id"}) for m in messages],
+        },
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def create_node_cache():
+    """Returns a Redis-backed node cache, or an in-process one when Redis is unavailable."""
+    binary_client = get_redis_binary_client()
+    if binary_client is not None:
+        return RedisCache(binary_client)
+    return InMemoryCache()
+
 # --- 3. Define Conditional Edge Logic (Remains Correct) ---
 
 def should_continue(state: GraphState):
     """Decides whether to loop back to the planner, or end the process."""
-    last_message = state['messages'][-1]
-    # Check if the last message has a tool_calls attribute and if the list is populated
-    if hasattr(last_message, 'tool_calls') and last_message.tool_calls:
-        return "continue_tool"
-    return "end"
+    # Loop to the executor only if the last message requested tools
+    return "continue_tool" if getattr(state['messages'][-1], 'tool_calls', None) else "end"
 
 # --- 4. Build and Compile the Graph (Remains Correct) ---
 
 def create_agent_graph():
     """Builds and returns the compiled LangGraph object."""
     workflow = StateGraph(GraphState)
-    workflow.add_node("planner", call_model)
+    workflow.add_node(
+        "planner",
+        call_model,
+        cache_policy=CachePolicy(key_func=planner_cache_key, ttl=PLANNER_CACHE_TTL),
+    )
     workflow.add_node("tool_executor", call_tool_executor)
     workflow.set_entry_point("planner")
     workflow.add_conditional_edges(
@@ -170,7 +397,17 @@ def create_agent_graph():
         {"continue_tool": "tool_executor", "end": END}
     )
     workflow.add_edge("tool_executor", "planner")
-    return workflow.compile()
+    return workflow.compile(cache=create_node_cache())
+
+
+@lru_cache(maxsize=1)
+def get_app():
+    """Returns the compiled agent graph, building it (and the LLM clients) on first call."""
+    get_model_with_tools()
+    get_semantic_cache()
+    return create_agent_graph()
+
 
-# Example usage (Visualization code is assumed to be appended here)
-app = create_agent_graph()
\ No newline at end of file
+if __name__ == "__main__":
+    # Visualize the graph structure
+    print(get_app().get_graph().draw_ascii())
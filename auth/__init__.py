@@ -7,8 +7,8 @@ and FastAPI dependencies for user authentication.
 
 from .jwt import create_access_token, create_refresh_token, verify_token
 from .password import hash_password, verify_password
-from .oauth import google_oauth_callback
-from .dependencies import get_current_user
+from .oauth import google_oauth_callback, close_http_client
+from .dependencies import get_current_user, invalidate_user_cache
 
 __all__ = [
     'create_access_token',
@@ -17,5 +17,7 @@ __all__ = [
     'hash_password',
     'verify_password',
     'google_oauth_callback',
+    'close_http_client',
     'get_current_user',
+    'invalidate_user_cache',
 ]
@@ -5,25 +5,109 @@ Provides dependency injection for authenticated routes.
 Use get_current_user as a dependency to require authentication.
 """
 
-from fastapi import Depends, HTTPException, status
-from fastapi.security import OAuth2PasswordBearer
+import time
+import asyncio
+import hashlib
+from fastapi import Depends, HTTPException, Request, status
 from typing import Tuple, Optional
-from .jwt import verify_token
+from cachetools import TTLCache
+from .jwt import verify_token_claims
+from cache import is_jwt_blacklisted_async
 import db_manager
 
-# OAuth2 scheme for token extraction from Authorization header
-# tokenUrl is the login endpoint that returns tokens
-oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
 
+async def bearer_token(request: Request) -> str:
+    """
+    Extract the token from an "Authorization: Bearer <token>" header.
+
+    A plain header split instead of OAuth2PasswordBearer, which runs
+    Starlette's security-scheme machinery on every request. The scheme is
+    matched case-insensitively, as OAuth2PasswordBearer did; unlike it, this
+    dependency does not declare a security scheme in the OpenAPI docs.
+
+    Args:
+        request: Incoming request
+
+    Returns:
+        The bearer token, or "" if the header is missing or not a Bearer token
+    """
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    return token if scheme.lower() == "bearer" else ""
+
+
+# Verified tokens: blake2b(token) -> ((user_id, email), expires_at monotonic)
+# Saves the HMAC check and the users lookup when a token is reused within its lifetime
+_TOKEN_CACHE = TTLCache(maxsize=10_000, ttl=300)
+
+
+def invalidate_user_cache(user_id: int) -> None:
+    """
+    Drop a user from the in-process caches after their record changes.
+
+    Args:
+        user_id: The user's database ID
+    """
+    db_manager.invalidate_user(user_id)
+    for key, (user, _) in list(_TOKEN_CACHE.items()):
+        if user[0] == user_id:
+            _TOKEN_CACHE.pop(key, None)
+
+
+def _token_cache_key(token: str) -> bytes:
+    """Hashes the token so raw credentials are never kept in memory as cache keys."""
+    return hashlib.blake2b(token.encode(), digest_size=16).digest()
+
+
+async def _resolve_user(token: str) -> Optional[Tuple[int, str]]:
+    """
+    Resolves an access token to (user_id, email), using the in-process token cache.
+
+    Blacklisted (logged out) tokens are rejected even when cached, and cached
+    entries never outlive the token's own expiry.
 
-async def get_current_user(token: str = Depends(oauth2_scheme)) -> Tuple[int, str]:
+    Args:
+        token: JWT access token
+
+    Returns:
+        Tuple of (user_id, email) if valid, None otherwise
+    """
+    if await is_jwt_blacklisted_async(token):
+        return None
+
+    key = _token_cache_key(token)
+    cached = _TOKEN_CACHE.get(key)
+    if cached is not None:
+        user, expires_at = cached
+        if time.monotonic() < expires_at:
+            return user
+        _TOKEN_CACHE.pop(key, None)
+
+    # One decode gives both the user and the expiry the cache entry is bounded by
+    claims = verify_token_claims(token, token_type="access")
+    if claims is None:
+        return None
+    user_id, exp = claims
+
+    # get_user_by_id is cached in db_manager but may hit the database, so keep it off the event loop
+    user = await asyncio.to_thread(db_manager.get_user_by_id, user_id)
+    if user is None:
+        return None
+
+    # exp and time.time() are both Unix timestamps, so this holds in any host timezone
+    remaining = exp - time.time()
+    if remaining > 0:
+        _TOKEN_CACHE[key] = (user, time.monotonic() + remaining)
+    return user
+
+
+async def get_current_user(token: str = Depends(bearer_token)) -> Tuple[int, str]:
     """
     FastAPI dependency that extracts and validates the current user from JWT token.
 
     Checks Authorization header for Bearer token, verifies it, and returns user info.
 
     Args:
-        token: JWT token from Authorization header (injected by oauth2_scheme)
+        token: JWT token from Authorization header (injected by bearer_token)
 
     Returns:
         Tuple of (user_id, email) for the authenticated user
@@ -43,14 +127,11 @@ async def get_current_user(token: str = Depends(oauth2_scheme)) -> Tuple[int, st
         headers={"WWW-Authenticate": "Bearer"},
     )
 
-    # Verify and decode the token
-    user_id = verify_token(token, token_type="access")
-
-    if user_id is None:
+    if not token:
         raise credentials_exception
 
-    # Fetch user from database
-    user = db_manager.get_user_by_id(user_id)
+    # Verify the token and fetch the user (cached per token)
+    user = await _resolve_user(token)
 
     if user is None:
         raise credentials_exception
@@ -59,7 +140,7 @@ async def get_current_user(token: str = Depends(oauth2_scheme)) -> Tuple[int, st
     return user
 
 
-async def get_current_user_optional(token: Optional[str] = Depends(oauth2_scheme)) -> Optional[Tuple[int, str]]:
+async def get_current_user_optional(token: str = Depends(bearer_token)) -> Optional[Tuple[int, str]]:
     """
     Optional authentication dependency.
 
@@ -86,11 +167,6 @@ async def get_current_user_optional(token: Optional[str] = Depends(oauth2_scheme
         return None
 
     try:
-        user_id = verify_token(token, token_type="access")
-        if user_id is None:
-            return None
-
-        user = db_manager.get_user_by_id(user_id)
-        return user
+        return await _resolve_user(token)
     except Exception:
         return None
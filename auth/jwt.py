@@ -2,12 +2,14 @@
 JWT token management for authentication.
 
 Provides functions to create and verify access and refresh tokens.
-Uses JOSE (JavaScript Object Signing and Encryption) for JWT handling.
+Uses PyJWT (HMAC backed by the cryptography/OpenSSL bindings) for JWT handling.
 """
 
+import time
 from datetime import datetime, timedelta
-from jose import JWTError, jwt
-from typing import Optional
+import jwt
+from jwt import InvalidTokenError
+from typing import Optional, Tuple
 import os
 
 # JWT Configuration
@@ -16,6 +18,10 @@ ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 15
 REFRESH_TOKEN_EXPIRE_DAYS = 7
 
+# Encode the secret once instead of on every sign/verify
+_SECRET_KEY_BYTES = SECRET_KEY.encode()
+_DECODE_OPTIONS = {"require": ["exp", "sub", "type"]}
+
 
 def create_access_token(user_id: int) -> str:
     """
@@ -34,7 +40,7 @@ def create_access_token(user_id: int) -> str:
         "type": "access",
         "iat": datetime.utcnow()
     }
-    return jwt.encode(payload, SECRET_KEY, algorithm=ALGORITHM)
+    return jwt.encode(payload, _SECRET_KEY_BYTES, algorithm=ALGORITHM)
 
 
 def create_refresh_token(user_id: int) -> str:
@@ -54,22 +60,22 @@ def create_refresh_token(user_id: int) -> str:
         "type": "refresh",
         "iat": datetime.utcnow()
     }
-    return jwt.encode(payload, SECRET_KEY, algorithm=ALGORITHM)
+    return jwt.encode(payload, _SECRET_KEY_BYTES, algorithm=ALGORITHM)
 
 
-def verify_token(token: str, token_type: str = "access") -> Optional[int]:
+def verify_token_claims(token: str, token_type: str = "access") -> Optional[Tuple[int, int]]:
     """
-    Verify and decode a JWT token.
+    Verify and decode a JWT token, returning its user ID and expiry from one decode.
 
     Args:
         token: The JWT token string
         token_type: Expected token type ("access" or "refresh")
 
     Returns:
-        User ID if token is valid, None otherwise
+        (user_id, exp) with exp as a Unix timestamp if the token is valid, None otherwise
     """
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = jwt.decode(token, _SECRET_KEY_BYTES, algorithms=[ALGORITHM], options=_DECODE_OPTIONS)
 
         # Verify token type matches expected type
         if payload.get("type") != token_type:
@@ -80,9 +86,9 @@ def verify_token(token: str, token_type: str = "access") -> Optional[int]:
         if user_id is None:
             return None
 
-        return int(user_id)
+        return int(user_id), int(payload["exp"])
 
-    except JWTError:
+    except InvalidTokenError:
         # Token is invalid, expired, or malformed
         return None
     except ValueError:
@@ -90,6 +96,21 @@ def verify_token(token: str, token_type: str = "access") -> Optional[int]:
         return None
 
 
+def verify_token(token: str, token_type: str = "access") -> Optional[int]:
+    """
+    Verify and decode a JWT token.
+
+    Args:
+        token: The JWT token string
+        token_type: Expected token type ("access" or "refresh")
+
+    Returns:
+        User ID if token is valid, None otherwise
+    """
+    claims = verify_token_claims(token, token_type)
+    return claims[0] if claims else None
+
+
 def get_token_expiry(token: str) -> Optional[int]:
     """
     Get the expiration time remaining for a token.
@@ -101,15 +122,16 @@ def get_token_expiry(token: str) -> Optional[int]:
         Seconds until expiration, or None if token is invalid
     """
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = jwt.decode(token, _SECRET_KEY_BYTES, algorithms=[ALGORITHM], options=_DECODE_OPTIONS)
         exp = payload.get("exp")
         if exp is None:
             return None
 
-        now = datetime.utcnow().timestamp()
-        expiry = exp - now
+        # exp is a Unix timestamp; time.time() is too (datetime.utcnow().timestamp() is not,
+        # since it reads the naive UTC time as local time)
+        expiry = exp - time.time()
 
         return int(max(0, expiry))
 
-    except JWTError:
+    except InvalidTokenError:
         return None
@@ -2,21 +2,76 @@
 Google OAuth 2.0 authentication integration.
 
 Handles OAuth authorization code flow for Google Sign-In.
-Requires GOOGLE_CLIENT_ID, GOOGLE_CLIENT_SECRET, and GOOGLE_REDIRECT_URI env vars.
+Reads GOOGLE_CLIENT_ID, GOOGLE_CLIENT_SECRET, and GOOGLE_REDIRECT_URI env vars at import;
+configure() replaces them with an explicit OAuthConfig.
 """
 
 import httpx
 import os
+import jwt
+from dataclasses import dataclass
+import orjson
 from typing import Dict, Optional
+from urllib.parse import quote, urlencode
+from cachetools import TTLCache
 
-# Google OAuth configuration
-GOOGLE_CLIENT_ID = os.getenv("GOOGLE_CLIENT_ID")
-GOOGLE_CLIENT_SECRET = os.getenv("GOOGLE_CLIENT_SECRET")
-GOOGLE_REDIRECT_URI = os.getenv("GOOGLE_REDIRECT_URI")
+@dataclass(frozen=True)
+class OAuthConfig:
+    """Google OAuth client settings."""
+    client_id: Optional[str] = None
+    client_secret: Optional[str] = None
+    redirect_uri: Optional[str] = None
+
+    @classmethod
+    def from_env(cls) -> "OAuthConfig":
+        """Reads GOOGLE_CLIENT_ID, GOOGLE_CLIENT_SECRET and GOOGLE_REDIRECT_URI."""
+        return cls(
+            client_id=os.getenv("GOOGLE_CLIENT_ID"),
+            client_secret=os.getenv("GOOGLE_CLIENT_SECRET"),
+            redirect_uri=os.getenv("GOOGLE_REDIRECT_URI"),
+        )
+
+
+# Google OAuth configuration; replace with configure() instead of editing env vars
+_config = OAuthConfig.from_env()
 
 # Google OAuth endpoints
+GOOGLE_AUTH_URL = "https://accounts.google.com/o/oauth2/v2/auth"
 GOOGLE_TOKEN_URL = "https://oauth2.googleapis.com/token"
 GOOGLE_USERINFO_URL = "https://www.googleapis.com/oauth2/v2/userinfo"
+GOOGLE_JWKS_URL = "https://www.googleapis.com/oauth2/v3/certs"
+GOOGLE_ISSUERS = ("accounts.google.com", "https://accounts.google.com")
+
+# Google's signing keys (kid -> PyJWK); Google rotates them roughly daily
+_JWKS_CACHE: TTLCache = TTLCache(maxsize=1, ttl=3600)
+
+# Shared HTTP/2 client so logins reuse pooled TLS connections to Google
+_http_client: Optional[httpx.AsyncClient] = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """
+    Get the shared async HTTP client, creating it on first use.
+
+    Returns:
+        httpx.AsyncClient with HTTP/2 and keep-alive enabled
+    """
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(
+            http2=True,
+            timeout=10.0,
+            limits=httpx.Limits(max_keepalive_connections=20)
+        )
+    return _http_client
+
+
+async def close_http_client() -> None:
+    """Close the shared HTTP client (call on application shutdown)."""
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
 
 
 class GoogleUserInfo:
@@ -33,12 +88,76 @@ class GoogleUserInfo:
         self.locale = data.get("locale")
 
 
+async def _get_google_signing_key(kid: str, refresh: bool = False) -> Optional[jwt.PyJWK]:
+    """
+    Look up one of Google's ID token signing keys, fetching the JWK set if needed.
+
+    Args:
+        kid: Key ID from the ID token header
+        refresh: Force a refetch (used when the key set has rotated)
+
+    Returns:
+        PyJWK for the key, or None if Google does not publish that key ID
+    """
+    keys = None if refresh else _JWKS_CACHE.get("keys")
+    if keys is None:
+        response = await get_http_client().get(GOOGLE_JWKS_URL)
+        response.raise_for_status()
+        keys = {
+            jwk["kid"]: jwt.PyJWK(jwk)
+            for jwk in orjson.loads(response.content).get("keys", [])
+        }
+        _JWKS_CACHE["keys"] = keys
+
+    key = keys.get(kid)
+    if key is None and not refresh:
+        return await _get_google_signing_key(kid, refresh=True)
+    return key
+
+
+async def verify_google_id_token(id_token: str) -> Optional[dict]:
+    """
+    Verify a Google ID token locally and return its claims.
+
+    Checks the RS256 signature against Google's published keys, plus the
+    audience (our client ID), issuer and expiry.
+
+    Args:
+        id_token: ID token from Google's token endpoint
+
+    Returns:
+        Claims dict if the token is valid, None otherwise
+    """
+    try:
+        kid = jwt.get_unverified_header(id_token).get("kid")
+        signing_key = await _get_google_signing_key(kid)
+        if signing_key is None:
+            print(f"Unknown Google signing key: {kid}")
+            return None
+
+        claims = jwt.decode(
+            id_token,
+            signing_key.key,
+            algorithms=["RS256"],
+            audience=_config.client_id,
+            options={"require": ["exp", "iss", "aud", "sub"]}
+        )
+        if claims.get("iss") not in GOOGLE_ISSUERS:
+            print(f"Unexpected ID token issuer: {claims.get('iss')}")
+            return None
+        return claims
+    except (jwt.InvalidTokenError, httpx.HTTPError) as e:
+        print(f"ID token verification failed: {e}")
+        return None
+
+
 async def google_oauth_callback(code: str) -> Optional[GoogleUserInfo]:
     """
     Exchange authorization code for user information.
 
     This is step 2 of the OAuth flow - after user authorizes on Google,
-    we exchange the code for an access token and fetch user info.
+    we exchange the code for tokens and read the user info from the
+    verified ID token. /userinfo is only called if no ID token is returned.
 
     Args:
         code: Authorization code from Google OAuth redirect
@@ -50,55 +169,105 @@ async def google_oauth_callback(code: str) -> Optional[GoogleUserInfo]:
         httpx.HTTPError: If API requests fail
         ValueError: If required environment variables are missing
     """
-    if not all([GOOGLE_CLIENT_ID, GOOGLE_CLIENT_SECRET, GOOGLE_REDIRECT_URI]):
+    config = _config
+    if not all([config.client_id, config.client_secret, config.redirect_uri]):
         raise ValueError(
             "Missing required Google OAuth environment variables: "
             "GOOGLE_CLIENT_ID, GOOGLE_CLIENT_SECRET, GOOGLE_REDIRECT_URI"
         )
 
-    async with httpx.AsyncClient() as client:
-        # Step 1: Exchange authorization code for access token
-        token_response = await client.post(
-            GOOGLE_TOKEN_URL,
-            data={
-                "code": code,
-                "client_id": GOOGLE_CLIENT_ID,
-                "client_secret": GOOGLE_CLIENT_SECRET,
-                "redirect_uri": GOOGLE_REDIRECT_URI,
-                "grant_type": "authorization_code"
-            },
-            headers={"Content-Type": "application/x-www-form-urlencoded"}
-        )
+    client = get_http_client()
 
-        if token_response.status_code != 200:
-            print(f"Token exchange failed: {token_response.text}")
-            return None
+    # Step 1: Exchange authorization code for access token
+    token_response = await client.post(
+        GOOGLE_TOKEN_URL,
+        data={
+            "code": code,
+            "client_id": config.client_id,
+            "client_secret": config.client_secret,
+            "redirect_uri": config.redirect_uri,
+            "grant_type": "authorization_code"
+        },
+        headers={"Content-Type": "application/x-www-form-urlencoded"}
+    )
 
-        token_data = token_response.json()
-        access_token = token_data.get("access_token")
+    if token_response.status_code != 200:
+        print(f"Token exchange failed: {token_response.text}")
+        return None
 
-        if not access_token:
-            print("No access token in response")
+    token_data = orjson.loads(token_response.content)
+
+    # Step 2: Read user info from the ID token (no extra round-trip to Google)
+    id_token = token_data.get("id_token")
+    if id_token:
+        claims = await verify_google_id_token(id_token)
+        if claims is None:
             return None
+        return GoogleUserInfo({
+            **claims,
+            "id": claims.get("sub"),
+            "verified_email": claims.get("email_verified", False)
+        })
 
-        # Step 2: Use access token to fetch user information
-        user_response = await client.get(
-            GOOGLE_USERINFO_URL,
-            headers={"Authorization": f"Bearer {access_token}"}
-        )
+    # Fallback: fetch user info with the access token
+    access_token = token_data.get("access_token")
 
-        if user_response.status_code != 200:
-            print(f"Userinfo fetch failed: {user_response.text}")
-            return None
+    if not access_token:
+        print("No access token in response")
+        return None
+
+    user_response = await client.get(
+        GOOGLE_USERINFO_URL,
+        headers={"Authorization": f"Bearer {access_token}"}
+    )
+
+    if user_response.status_code != 200:
+        print(f"Userinfo fetch failed: {user_response.text}")
+        return None
+
+    user_data = orjson.loads(user_response.content)
+    return GoogleUserInfo(user_data)
+
+
+def _build_google_auth_url(client_id: Optional[str], redirect_uri: Optional[str]) -> Optional[str]:
+    """Builds the static part of the authorization URL, or None if OAuth isn't configured."""
+    if not client_id or not redirect_uri:
+        return None
+
+    params = {
+        "client_id": client_id,
+        "redirect_uri": redirect_uri,
+        "response_type": "code",
+        "scope": "openid email profile",
+        "access_type": "offline",
+        "prompt": "consent"
+    }
+    return f"{GOOGLE_AUTH_URL}?{urlencode(params)}"
 
-        user_data = user_response.json()
-        return GoogleUserInfo(user_data)
 
+# Only the per-login state varies, so the rest of the URL is encoded once per configuration
+_GOOGLE_AUTH_URL = _build_google_auth_url(_config.client_id, _config.redirect_uri)
 
-def get_google_auth_url() -> str:
+
+def configure(config: OAuthConfig) -> None:
+    """
+    Replace the OAuth settings read from the environment at import.
+
+    Args:
+        config: Google OAuth client settings to use from now on
+    """
+    global _config, _GOOGLE_AUTH_URL
+    _config = config
+    _GOOGLE_AUTH_URL = _build_google_auth_url(config.client_id, config.redirect_uri)
+
+
+def get_google_auth_url(state: Optional[str] = None) -> str:
     """
     Generate Google OAuth authorization URL.
 
+    Args:
+        state: Optional anti-CSRF value, echoed back by Google to the redirect URI
+
     Returns:
         Full URL to redirect user to for Google Sign-In
 
@@ -106,18 +275,9 @@ def get_google_auth_url() -> str:
         https://accounts.google.com/o/oauth2/v2/auth?
         client_id=...&redirect_uri=...&response_type=code&scope=...
     """
-    if not GOOGLE_CLIENT_ID or not GOOGLE_REDIRECT_URI:
+    if _GOOGLE_AUTH_URL is None:
         raise ValueError("GOOGLE_CLIENT_ID and GOOGLE_REDIRECT_URI must be set")
 
-    from urllib.parse import urlencode
-
-    params = {
-        "client_id": GOOGLE_CLIENT_ID,
-        "redirect_uri": GOOGLE_REDIRECT_URI,
-        "response_type": "code",
-        "scope": "openid email profile",
-        "access_type": "offline",
-        "prompt": "consent"
-    }
-
-    return f"https://accounts.google.com/o/oauth2/v2/auth?{urlencode(params)}"
+    if state:
+        return f"{_GOOGLE_AUTH_URL}&state={quote(state, safe='')}"
+    return _GOOGLE_AUTH_URL
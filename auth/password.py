@@ -1,35 +1,42 @@
 """
-Password hashing and verification using bcrypt.
+Password hashing and verification using argon2id.
 
 Provides secure password hashing with salt for user authentication.
-Uses bcrypt algorithm with cost factor 12 for security.
+New hashes use argon2id; existing bcrypt hashes still verify and are
+flagged by needs_rehash() so they can be upgraded on the next login.
 """
 
 from passlib.context import CryptContext
 
-# Configure password context with bcrypt
-# Cost factor 12 provides good security/performance balance
+# Configure password context with argon2id (default) and bcrypt (legacy hashes)
+# argon2 parameters follow the OWASP minimum: 19 MiB memory, 2 passes, 1 lane
+# Built once at import; bcrypt is pinned to the $2b$ ident so no variant has to be chosen per hash
 pwd_context = CryptContext(
-    schemes=["bcrypt"],
+    schemes=["argon2", "bcrypt"],
+    default="argon2",
     deprecated="auto",
-    bcrypt__rounds=12
+    argon2__memory_cost=19456,
+    argon2__time_cost=2,
+    argon2__parallelism=1,
+    bcrypt__rounds=12,
+    bcrypt__ident="2b"
 )
 
 
 def hash_password(password: str) -> str:
     """
-    Hash a plain-text password using bcrypt.
+    Hash a plain-text password using argon2id.
 
     Args:
         password: Plain-text password string
 
     Returns:
-        Bcrypt hashed password string
+        Argon2id hashed password string
 
     Example:
         >>> hashed = hash_password("my_secure_password")
         >>> print(hashed)
-        $2b$12$... (60 character hash)
+        $argon2id$v=19$m=19456,t=2,p=1$...
     """
     return pwd_context.hash(password)
 
@@ -40,7 +47,7 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
 
     Args:
         plain_password: Plain-text password to verify
-        hashed_password: Bcrypt hashed password from database
+        hashed_password: Argon2 or bcrypt hashed password from database
 
     Returns:
         True if password matches, False otherwise
@@ -1,23 +1,60 @@
 """
 Caching module using Redis.
 
-Provides functions for session caching, JWT blacklisting, and rate limiting.
+Provides functions for session caching, JWT blacklisting, rate limiting,
+and semantic caching of LLM responses.
 """
 
 from .redis_client import (
     get_redis_client,
+    get_redis_binary_client,
     blacklist_jwt,
     is_jwt_blacklisted,
+    are_jwts_blacklisted,
     cache_user_session,
     get_cached_session,
-    delete_cached_session
+    get_session_fields,
+    update_session_fields,
+    delete_cached_session,
+    load_auth_context,
+    logout,
+    blacklist_jwt_async,
+    is_jwt_blacklisted_async,
+    cache_user_session_async,
+    get_cached_session_async,
+    get_session_fields_async,
+    update_session_fields_async,
+    delete_cached_session_async,
+    load_auth_context_async,
+    logout_async,
+    ensure_semantic_cache_index,
+    semantic_cache_lookup,
+    semantic_cache_store
 )
 
 __all__ = [
     'get_redis_client',
+    'get_redis_binary_client',
     'blacklist_jwt',
     'is_jwt_blacklisted',
+    'are_jwts_blacklisted',
     'cache_user_session',
     'get_cached_session',
+    'get_session_fields',
+    'update_session_fields',
     'delete_cached_session',
+    'load_auth_context',
+    'logout',
+    'blacklist_jwt_async',
+    'is_jwt_blacklisted_async',
+    'cache_user_session_async',
+    'get_cached_session_async',
+    'get_session_fields_async',
+    'update_session_fields_async',
+    'delete_cached_session_async',
+    'load_auth_context_async',
+    'logout_async',
+    'ensure_semantic_cache_index',
+    'semantic_cache_lookup',
+    'semantic_cache_store',
 ]
@@ -1,35 +1,204 @@
 """
 Redis client for caching and session management.
 
-Provides functions for JWT blacklisting, user session caching, and rate limiting.
+Provides functions for JWT blacklisting, user session caching, rate limiting,
+and a semantic (embedding-similarity) cache for LLM responses.
 Falls back gracefully if Redis is unavailable (logs warning but doesn't crash).
 """
 
+import asyncio
+import logging
+import functools
+import threading
 import redis
+import redis.asyncio as aioredis
 import os
-import json
-from typing import Optional, Dict, Any
+import re
+import orjson
+import msgpack
+import hashlib
+from array import array
+from cachetools import TTLCache
+from collections.abc import Mapping
+from typing import Optional, Dict, Any, List, Tuple
+from redis.backoff import ExponentialWithJitterBackoff
+from redis.commands.search.field import TagField, TextField, VectorField
+from redis.commands.search.index_definition import IndexDefinition, IndexType
+from redis.commands.search.query import Query
+
+logger = logging.getLogger(__name__)
 
 # Redis configuration
 REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379")
+REDIS_POOL_SIZE = int(os.getenv("REDIS_POOL_SIZE", "32"))
 
-# Initialize Redis client
-try:
-    redis_client = redis.from_url(
+
+def _create_pool(decode_responses: bool) -> redis.BlockingConnectionPool:
+    """Build a bounded pool; callers wait up to 5s for a free connection instead of opening more."""
+    return redis.BlockingConnectionPool.from_url(
+        REDIS_URL,
+        max_connections=REDIS_POOL_SIZE,
+        timeout=5,
+        socket_connect_timeout=5,
+        socket_timeout=5,
+        decode_responses=decode_responses
+    )
+
+
+# Clients are built without touching the network: connections are opened on first use,
+# so importing this module never blocks on an unreachable Redis. REDIS_AVAILABLE starts
+# optimistic and is flipped off by the first connection failure (see _with_redis).
+redis_client = redis.Redis(connection_pool=_create_pool(decode_responses=True))
+
+# Bytes-in/bytes-out client on its own pool, for callers storing binary payloads
+redis_binary_client = redis.Redis(connection_pool=_create_pool(decode_responses=False))
+
+# Async clients for request handlers; same pools sizing, non-blocking sockets
+async_redis_client = aioredis.Redis(
+    connection_pool=aioredis.BlockingConnectionPool.from_url(
         REDIS_URL,
-        decode_responses=True,
+        max_connections=REDIS_POOL_SIZE,
+        timeout=5,
         socket_connect_timeout=5,
-        socket_timeout=5
+        socket_timeout=5,
+        decode_responses=True
     )
-    # Test connection
-    redis_client.ping()
-    REDIS_AVAILABLE = True
-    print("✓ Redis connected successfully")
-except Exception as e:
-    print(f"⚠ Redis connection failed: {e}")
-    print("  Webapp will function without caching")
-    redis_client = None
-    REDIS_AVAILABLE = False
+)
+
+async_redis_binary_client = aioredis.Redis(
+    connection_pool=aioredis.BlockingConnectionPool.from_url(
+        REDIS_URL,
+        max_connections=REDIS_POOL_SIZE,
+        timeout=5,
+        socket_connect_timeout=5,
+        socket_timeout=5,
+        decode_responses=False
+    )
+)
+
+REDIS_AVAILABLE = True
+
+
+# Key prefixes (kept short: every byte is stored per key and sent on every command)
+_BL = "b:"      # JWT blacklist
+_SESS = "s:"    # cached user sessions
+_MIG = "m:"     # Telegram-to-web migration codes
+
+# Prebuilt key formatters: a bound str.__mod__ is one C call, no f-string bytecode per call
+_session_key = (_SESS + "%s").__mod__
+_migration_key = (_MIG + "%s").__mod__
+
+# GET + DEL in one atomic step; registered once (EVALSHA, falling back to loading the script)
+_CONSUME_LUA = "local v=redis.call('GET',KEYS[1]); if v then redis.call('DEL',KEYS[1]) end; return v"
+_consume_script = redis_client.register_script(_CONSUME_LUA)
+_consume_script_async = async_redis_client.register_script(_CONSUME_LUA)
+
+# SETEX blacklist entry + DEL cached session, atomically, for logout
+_LOGOUT_LUA = "redis.call('SETEX',KEYS[1],ARGV[1],'1'); redis.call('DEL',KEYS[2]); return 1"
+_logout_script = redis_client.register_script(_LOGOUT_LUA)
+_logout_script_async = async_redis_client.register_script(_LOGOUT_LUA)
+
+
+def _blacklist_key(token: str) -> str:
+    """Blacklist key for a JWT: a 32-hex-char BLAKE2b digest instead of the full token."""
+    return _BL + hashlib.blake2b(token.encode(), digest_size=16).hexdigest()
+
+
+# Blacklist keys recently confirmed absent, so repeat checks of a live token skip Redis.
+# Blacklisting in this process evicts the entry at once; other workers may keep
+# accepting a just-revoked token for up to the TTL (30s).
+_NOT_BLACKLISTED = TTLCache(maxsize=4096, ttl=30)
+_not_blacklisted_lock = threading.Lock()
+
+
+def _known_not_blacklisted(key: str) -> bool:
+    with _not_blacklisted_lock:
+        return key in _NOT_BLACKLISTED
+
+
+def _mark_not_blacklisted(key: str) -> None:
+    with _not_blacklisted_lock:
+        _NOT_BLACKLISTED[key] = True
+
+
+def _forget_not_blacklisted(key: str) -> None:
+    with _not_blacklisted_lock:
+        _NOT_BLACKLISTED.pop(key, None)
+
+
+# ===== AVAILABILITY =====
+# A connection failure marks Redis unavailable and schedules one background ping; while
+# it is down, decorated helpers return their "unavailable" default without a network call.
+# Pings back off exponentially (with jitter) until Redis answers again.
+
+_RECONNECT_BACKOFF = ExponentialWithJitterBackoff(cap=60, base=1)
+_reconnect_lock = threading.Lock()
+_reconnect_failures = 0
+
+
+def _schedule_reconnect() -> None:
+    """Start the background ping timer; caller holds _reconnect_lock."""
+    global _reconnect_failures
+    _reconnect_failures += 1
+    timer = threading.Timer(_RECONNECT_BACKOFF.compute(_reconnect_failures), _try_reconnect)
+    timer.daemon = True
+    timer.start()
+
+
+def _try_reconnect() -> None:
+    """Ping Redis; mark it available again on success, otherwise back off and retry."""
+    global REDIS_AVAILABLE, _reconnect_failures
+    try:
+        redis_client.ping()
+    except Exception:
+        with _reconnect_lock:
+            _schedule_reconnect()
+        return
+    with _reconnect_lock:
+        _reconnect_failures = 0
+        REDIS_AVAILABLE = True
+    logger.info("Redis connection restored")
+
+
+def _redis_error(name: str, error: Exception) -> None:
+    """Log a failed Redis call; connection failures also take Redis offline until it answers a ping."""
+    global REDIS_AVAILABLE
+    if not isinstance(error, (redis.ConnectionError, redis.TimeoutError)):
+        logger.warning("Redis error in %s: %s", name, error)
+        return
+    with _reconnect_lock:
+        if not REDIS_AVAILABLE:
+            return
+        REDIS_AVAILABLE = False
+        _schedule_reconnect()
+    logger.warning("Redis connection failed, webapp will function without caching: %s", error)
+
+
+def _with_redis(default):
+    """
+    Decorate a Redis helper (sync or async) to return `default` while Redis is unavailable.
+
+    Args:
+        default: Value returned instead of calling the helper, or a callable taking the
+            helper's arguments that builds it
+    """
+    make_default = default if callable(default) else lambda *args, **kwargs: default
+
+    def decorator(func):
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                if not REDIS_AVAILABLE:
+                    return make_default(*args, **kwargs)
+                return await func(*args, **kwargs)
+        else:
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if not REDIS_AVAILABLE:
+                    return make_default(*args, **kwargs)
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
 
 
 def get_redis_client() -> Optional[redis.Redis]:
@@ -42,6 +211,17 @@ def get_redis_client() -> Optional[redis.Redis]:
     return redis_client if REDIS_AVAILABLE else None
 
 
+def get_redis_binary_client() -> Optional[redis.Redis]:
+    """
+    Get a Redis client that returns raw bytes (decode_responses=False).
+
+    Returns:
+        Binary Redis client if available, None otherwise
+    """
+    return redis_binary_client if REDIS_AVAILABLE else None
+
+
+@_with_redis(False)
 def blacklist_jwt(token: str, expiry_seconds: int) -> bool:
     """
     Add a JWT token to the blacklist (for logout).
@@ -53,17 +233,17 @@ def blacklist_jwt(token: str, expiry_seconds: int) -> bool:
     Returns:
         True if successful, False if Redis unavailable
     """
-    if not REDIS_AVAILABLE:
-        return False
-
     try:
-        redis_client.setex(f"blacklist:{token}", expiry_seconds, "1")
+        key = _blacklist_key(token)
+        _forget_not_blacklisted(key)
+        redis_client.setex(key, expiry_seconds, "1")
         return True
     except Exception as e:
-        print(f"Redis error in blacklist_jwt: {e}")
+        _redis_error("blacklist_jwt", e)
         return False
 
 
+@_with_redis(False)
 def is_jwt_blacklisted(token: str) -> bool:
     """
     Check if a JWT token is blacklisted.
@@ -74,16 +254,146 @@ def is_jwt_blacklisted(token: str) -> bool:
     Returns:
         True if blacklisted, False otherwise (or if Redis unavailable)
     """
-    if not REDIS_AVAILABLE:
+    try:
+        key = _blacklist_key(token)
+        if _known_not_blacklisted(key):
+            return False
+        blacklisted = bool(redis_client.exists(key))
+        if not blacklisted:
+            _mark_not_blacklisted(key)
+        return blacklisted
+    except Exception as e:
+        _redis_error("is_jwt_blacklisted", e)
         return False
 
+
+@_with_redis(lambda tokens: [False] * len(tokens))
+def are_jwts_blacklisted(tokens: List[str]) -> List[bool]:
+    """
+    Check several JWT tokens (e.g. access + refresh) against the blacklist in one round-trip.
+
+    Args:
+        tokens: JWT tokens to check
+
+    Returns:
+        One flag per token, in order (all False if Redis unavailable)
+    """
+    if not tokens:
+        return []
+
     try:
-        return redis_client.exists(f"blacklist:{token}") > 0
+        # EXISTS k1 k2 only returns a count, so pipeline one EXISTS per token
+        pipe = redis_client.pipeline(transaction=False)
+        for token in tokens:
+            pipe.exists(_blacklist_key(token))
+        return [bool(found) for found in pipe.execute()]
     except Exception as e:
-        print(f"Redis error in is_jwt_blacklisted: {e}")
-        return False
+        _redis_error("are_jwts_blacklisted", e)
+        return [False] * len(tokens)
+
+
+# Sessions are stored as a Redis HASH, one MessagePack-encoded value per field, so single
+# fields can be read (HMGET) or updated (HSET) without re-serializing the whole session.
+# Older entries are single string blobs: MessagePack behind a one-byte format version,
+# or plain JSON from before that. Those are still read until they expire.
+SESSION_FORMAT_MSGPACK = b"\x01"
+
+
+def _encode_session_fields(session_data: Dict[str, Any]) -> Dict[str, bytes]:
+    """Pack each session field into the MessagePack value stored in the hash."""
+    return {str(field): msgpack.packb(value, use_bin_type=True) for field, value in session_data.items()}
+
+
+def _is_wrong_type(error: Exception) -> bool:
+    """True if Redis rejected a hash command because the key holds a legacy string blob."""
+    return isinstance(error, redis.ResponseError) and str(error).startswith("WRONGTYPE")
+
+
+class _LazyHashSession(Mapping):
+    """
+    Read-only view over a session hash; each field is decoded on first access.
+
+    Callers that only check presence or read one field never decode the rest.
+    """
+
+    __slots__ = ("_raw", "_decoded")
+
+    def __init__(self, raw_fields: Dict[bytes, bytes]):
+        self._raw = {field.decode(): value for field, value in raw_fields.items()}
+        self._decoded: Dict[str, Any] = {}
+
+    def __getitem__(self, key):
+        if key not in self._decoded:
+            self._decoded[key] = msgpack.unpackb(self._raw[key], raw=False, strict_map_key=False)
+        return self._decoded[key]
+
+    def __iter__(self):
+        return iter(self._raw)
+
+    def __len__(self):
+        return len(self._raw)
+
+    def __repr__(self):
+        return f"_LazyHashSession({dict(self)!r})"
 
 
+class _LazySession(Mapping):
+    """
+    Read-only view over a legacy session string blob, decoded on first access.
+
+    Callers that only check whether a session exists never pay for the decode.
+    """
+
+    __slots__ = ("_raw", "_data")
+
+    def __init__(self, raw: bytes):
+        self._raw = raw
+        self._data = None
+
+    def _load(self) -> Dict[str, Any]:
+        if self._data is None:
+            raw = self._raw
+            try:
+                if raw[:1] == SESSION_FORMAT_MSGPACK:
+                    self._data = msgpack.unpackb(raw[1:], raw=False, strict_map_key=False)
+                else:
+                    # Legacy JSON blob from before the msgpack rollout; orjson parses the bytes directly
+                    self._data = orjson.loads(raw)
+            except Exception as e:
+                # A corrupt blob reads as an empty session rather than raising at the caller
+                logger.warning("Could not decode cached session: %s", e)
+                self._data = {}
+            self._raw = None
+        return self._data
+
+    def __getitem__(self, key):
+        return self._load()[key]
+
+    def __iter__(self):
+        return iter(self._load())
+
+    def __len__(self):
+        return len(self._load())
+
+    def __repr__(self):
+        return f"_LazySession({self._load()!r})"
+
+
+def _decode_session(data: Optional[bytes]) -> Optional[Mapping]:
+    """Wrap a legacy session blob (MessagePack, or JSON) for lazy decoding."""
+    if not data:
+        return None
+    return _LazySession(data)
+
+
+def _decode_session_hash(raw_fields: Optional[Dict[bytes, bytes]]) -> Optional[Mapping]:
+    """Wrap an HGETALL reply for lazy per-field decoding (an empty reply means no session)."""
+    if not raw_fields:
+        return None
+    return _LazyHashSession(raw_fields)
+
+
+@_with_redis(False)
 def cache_user_session(user_id: int, session_data: Dict[str, Any], ttl: int = 3600) -> bool:
     """
     Cache user session data.
@@ -96,22 +406,23 @@ def cache_user_session(user_id: int, session_data: Dict[str, Any], ttl: int = 36
     Returns:
         True if successful, False if Redis unavailable
     """
-    if not REDIS_AVAILABLE:
-        return False
-
     try:
-        redis_client.setex(
-            f"session:{user_id}",
-            ttl,
-            json.dumps(session_data)
-        )
+        key = _session_key(user_id)
+        # Replace the whole hash atomically (also converts a legacy string blob)
+        pipe = redis_binary_client.pipeline(transaction=True)
+        pipe.delete(key)
+        if session_data:
+            pipe.hset(key, mapping=_encode_session_fields(session_data))
+            pipe.expire(key, ttl)
+        pipe.execute()
         return True
     except Exception as e:
-        print(f"Redis error in cache_user_session: {e}")
+        _redis_error("cache_user_session", e)
         return False
 
 
-def get_cached_session(user_id: int) -> Optional[Dict[str, Any]]:
+@_with_redis(None)
+def get_cached_session(user_id: int) -> Optional[Mapping]:
     """
     Retrieve cached user session data.
 
@@ -119,42 +430,100 @@ def get_cached_session(user_id: int) -> Optional[Dict[str, Any]]:
         user_id: The user's ID
 
     Returns:
-        Session data dictionary if found, None otherwise
+        Session data mapping (decoded on first access) if found, None otherwise
     """
-    if not REDIS_AVAILABLE:
+    key = _session_key(user_id)
+    try:
+        try:
+            return _decode_session_hash(redis_binary_client.hgetall(key))
+        except redis.ResponseError as e:
+            if not _is_wrong_type(e):
+                raise
+            return _decode_session(redis_binary_client.get(key))
+    except Exception as e:
+        _redis_error("get_cached_session", e)
         return None
 
+
+@_with_redis(None)
+def get_session_fields(user_id: int, fields: List[str]) -> Optional[Dict[str, Any]]:
+    """
+    Read a subset of cached session fields (HMGET) without loading the rest.
+
+    Args:
+        user_id: The user's ID
+        fields: Field names to read
+
+    Returns:
+        Dict of field -> value (None for missing fields), or None if no session is cached
+    """
     try:
-        data = redis_client.get(f"session:{user_id}")
-        if data:
-            return json.loads(data)
-        return None
+        key = _session_key(user_id)
+        pipe = redis_binary_client.pipeline(transaction=False)
+        pipe.exists(key)
+        pipe.hmget(key, fields)
+        exists, values = pipe.execute()
+        if not exists:
+            return None
+        return {
+            field: msgpack.unpackb(value, raw=False, strict_map_key=False) if value is not None else None
+            for field, value in zip(fields, values)
+        }
     except Exception as e:
-        print(f"Redis error in get_cached_session: {e}")
+        _redis_error("get_session_fields", e)
         return None
 
 
-def delete_cached_session(user_id: int) -> bool:
+@_with_redis(False)
+def update_session_fields(user_id: int, fields: Dict[str, Any], ttl: int = 3600) -> bool:
     """
-    Delete cached user session data.
+    Update individual cached session fields in place (HSET), keeping the session's TTL.
+
+    A session that doesn't exist yet is created with the given TTL (EXPIRE NX, Redis 7+).
 
     Args:
         user_id: The user's ID
+        fields: Field names and new values
+        ttl: Time to live in seconds, only applied if the session had none
 
     Returns:
         True if successful, False if Redis unavailable
     """
-    if not REDIS_AVAILABLE:
+    if not fields:
+        return True
+
+    try:
+        key = _session_key(user_id)
+        pipe = redis_binary_client.pipeline(transaction=True)
+        pipe.hset(key, mapping=_encode_session_fields(fields))
+        pipe.expire(key, ttl, nx=True)
+        pipe.execute()
+        return True
+    except Exception as e:
+        _redis_error("update_session_fields", e)
         return False
 
+
+@_with_redis(False)
+def delete_cached_session(user_id: int) -> bool:
+    """
+    Delete cached user session data.
+
+    Args:
+        user_id: The user's ID
+
+    Returns:
+        True if successful, False if Redis unavailable
+    """
     try:
-        redis_client.delete(f"session:{user_id}")
+        redis_client.delete(_session_key(user_id))
         return True
     except Exception as e:
-        print(f"Redis error in delete_cached_session: {e}")
+        _redis_error("delete_cached_session", e)
         return False
 
 
+@_with_redis(False)
 def store_migration_code(code: str, telegram_user_id: str, ttl: int = 600) -> bool:
     """
     Store a Telegram-to-web migration verification code.
@@ -167,17 +536,15 @@ def store_migration_code(code: str, telegram_user_id: str, ttl: int = 600) -> bo
     Returns:
         True if successful, False if Redis unavailable
     """
-    if not REDIS_AVAILABLE:
-        return False
-
     try:
-        redis_client.setex(f"migration_code:{code}", ttl, telegram_user_id)
+        redis_client.setex(_migration_key(code), ttl, telegram_user_id)
         return True
     except Exception as e:
-        print(f"Redis error in store_migration_code: {e}")
+        _redis_error("store_migration_code", e)
         return False
 
 
+@_with_redis(None)
 def get_migration_code(code: str) -> Optional[str]:
     """
     Retrieve Telegram user ID from migration code.
@@ -188,16 +555,14 @@ def get_migration_code(code: str) -> Optional[str]:
     Returns:
         Telegram user ID if found, None otherwise
     """
-    if not REDIS_AVAILABLE:
-        return None
-
     try:
-        return redis_client.get(f"migration_code:{code}")
+        return redis_client.get(_migration_key(code))
     except Exception as e:
-        print(f"Redis error in get_migration_code: {e}")
+        _redis_error("get_migration_code", e)
         return None
 
 
+@_with_redis(False)
 def delete_migration_code(code: str) -> bool:
     """
     Delete a migration code after successful verification.
@@ -208,12 +573,422 @@ def delete_migration_code(code: str) -> bool:
     Returns:
         True if successful, False if Redis unavailable
     """
-    if not REDIS_AVAILABLE:
+    try:
+        redis_client.delete(_migration_key(code))
+        return True
+    except Exception as e:
+        _redis_error("delete_migration_code", e)
+        return False
+
+
+
+@_with_redis((False, None))
+def load_auth_context(token: str, user_id: int) -> Tuple[bool, Optional[Mapping]]:
+    """
+    Check the JWT blacklist and load the cached session in one round-trip.
+
+    Args:
+        token: The JWT token to check
+        user_id: The user's ID
+
+    Returns:
+        Tuple of (is_blacklisted, session data or None); (False, None) if Redis unavailable
+    """
+    try:
+        session_key = _session_key(user_id)
+        pipe = redis_binary_client.pipeline(transaction=False)
+        pipe.exists(_blacklist_key(token))
+        pipe.hgetall(session_key)
+        blacklisted, session = pipe.execute(raise_on_error=False)
+        if isinstance(blacklisted, Exception):
+            raise blacklisted
+        if _is_wrong_type(session):
+            return bool(blacklisted), _decode_session(redis_binary_client.get(session_key))
+        if isinstance(session, Exception):
+            raise session
+        return bool(blacklisted), _decode_session_hash(session)
+    except Exception as e:
+        _redis_error("load_auth_context", e)
+        return False, None
+
+
+@_with_redis(False)
+def logout(token: str, expiry_seconds: int, user_id: int) -> bool:
+    """
+    Blacklist a JWT and drop the user's cached session in one round-trip.
+
+    Runs as a server-side Lua script, so both changes apply atomically.
+
+    Args:
+        token: The JWT token to blacklist
+        expiry_seconds: How long to keep the token blacklisted (should match token expiry)
+        user_id: The user's ID
+
+    Returns:
+        True if successful, False if Redis unavailable
+    """
+    try:
+        key = _blacklist_key(token)
+        _forget_not_blacklisted(key)
+        _logout_script(keys=[key, _session_key(user_id)], args=[expiry_seconds])
+        return True
+    except Exception as e:
+        _redis_error("logout", e)
+        return False
+
+
+@_with_redis(None)
+def consume_migration_code(code: str) -> Optional[str]:
+    """
+    Look up a migration code and delete it atomically, in one round-trip.
+
+    Runs as a server-side Lua script, so a code can only be redeemed once.
+
+    Args:
+        code: Verification code
+
+    Returns:
+        Telegram user ID if the code was valid, None otherwise
+    """
+    try:
+        return _consume_script(keys=[_migration_key(code)])
+    except Exception as e:
+        _redis_error("consume_migration_code", e)
+        return None
+
+
+# ===== ASYNC VARIANTS =====
+# Same behaviour as the sync helpers above, for use inside async request handlers
+
+
+@_with_redis(False)
+async def blacklist_jwt_async(token: str, expiry_seconds: int) -> bool:
+    """Async version of blacklist_jwt."""
+    try:
+        key = _blacklist_key(token)
+        _forget_not_blacklisted(key)
+        await async_redis_client.setex(key, expiry_seconds, "1")
+        return True
+    except Exception as e:
+        _redis_error("blacklist_jwt_async", e)
+        return False
+
+
+@_with_redis(False)
+async def is_jwt_blacklisted_async(token: str) -> bool:
+    """Async version of is_jwt_blacklisted."""
+    try:
+        key = _blacklist_key(token)
+        if _known_not_blacklisted(key):
+            return False
+        blacklisted = bool(await async_redis_client.exists(key))
+        if not blacklisted:
+            _mark_not_blacklisted(key)
+        return blacklisted
+    except Exception as e:
+        _redis_error("is_jwt_blacklisted_async", e)
+        return False
+
+
+@_with_redis(False)
+async def cache_user_session_async(user_id: int, session_data: Dict[str, Any], ttl: int = 3600) -> bool:
+    """Async version of cache_user_session."""
+    try:
+        key = _session_key(user_id)
+        pipe = async_redis_binary_client.pipeline(transaction=True)
+        pipe.delete(key)
+        if session_data:
+            pipe.hset(key, mapping=_encode_session_fields(session_data))
+            pipe.expire(key, ttl)
+        await pipe.execute()
+        return True
+    except Exception as e:
+        _redis_error("cache_user_session_async", e)
+        return False
+
+
+@_with_redis(None)
+async def get_cached_session_async(user_id: int) -> Optional[Mapping]:
+    """Async version of get_cached_session."""
+    key = _session_key(user_id)
+    try:
+        try:
+            return _decode_session_hash(await async_redis_binary_client.hgetall(key))
+        except redis.ResponseError as e:
+            if not _is_wrong_type(e):
+                raise
+            return _decode_session(await async_redis_binary_client.get(key))
+    except Exception as e:
+        _redis_error("get_cached_session_async", e)
+        return None
+
+
+@_with_redis(None)
+async def get_session_fields_async(user_id: int, fields: List[str]) -> Optional[Dict[str, Any]]:
+    """Async version of get_session_fields."""
+    try:
+        key = _session_key(user_id)
+        pipe = async_redis_binary_client.pipeline(transaction=False)
+        pipe.exists(key)
+        pipe.hmget(key, fields)
+        exists, values = await pipe.execute()
+        if not exists:
+            return None
+        return {
+            field: msgpack.unpackb(value, raw=False, strict_map_key=False) if value is not None else None
+            for field, value in zip(fields, values)
+        }
+    except Exception as e:
+        _redis_error("get_session_fields_async", e)
+        return None
+
+
+@_with_redis(False)
+async def update_session_fields_async(user_id: int, fields: Dict[str, Any], ttl: int = 3600) -> bool:
+    """Async version of update_session_fields."""
+    if not fields:
+        return True
+
+    try:
+        key = _session_key(user_id)
+        pipe = async_redis_binary_client.pipeline(transaction=True)
+        pipe.hset(key, mapping=_encode_session_fields(fields))
+        pipe.expire(key, ttl, nx=True)
+        await pipe.execute()
+        return True
+    except Exception as e:
+        _redis_error("update_session_fields_async", e)
+        return False
+
+
+@_with_redis(False)
+async def delete_cached_session_async(user_id: int) -> bool:
+    """Async version of delete_cached_session."""
+    try:
+        await async_redis_client.delete(_session_key(user_id))
+        return True
+    except Exception as e:
+        _redis_error("delete_cached_session_async", e)
+        return False
+
+
+@_with_redis(False)
+async def store_migration_code_async(code: str, telegram_user_id: str, ttl: int = 600) -> bool:
+    """Async version of store_migration_code."""
+    try:
+        await async_redis_client.setex(_migration_key(code), ttl, telegram_user_id)
+        return True
+    except Exception as e:
+        _redis_error("store_migration_code_async", e)
+        return False
+
+
+@_with_redis(None)
+async def get_migration_code_async(code: str) -> Optional[str]:
+    """Async version of get_migration_code."""
+    try:
+        return await async_redis_client.get(_migration_key(code))
+    except Exception as e:
+        _redis_error("get_migration_code_async", e)
+        return None
+
+
+@_with_redis(False)
+async def delete_migration_code_async(code: str) -> bool:
+    """Async version of delete_migration_code."""
+    try:
+        await async_redis_client.delete(_migration_key(code))
+        return True
+    except Exception as e:
+        _redis_error("delete_migration_code_async", e)
+        return False
+
+
+@_with_redis((False, None))
+async def load_auth_context_async(token: str, user_id: int) -> Tuple[bool, Optional[Mapping]]:
+    """Async version of load_auth_context."""
+    try:
+        session_key = _session_key(user_id)
+        pipe = async_redis_binary_client.pipeline(transaction=False)
+        pipe.exists(_blacklist_key(token))
+        pipe.hgetall(session_key)
+        blacklisted, session = await pipe.execute(raise_on_error=False)
+        if isinstance(blacklisted, Exception):
+            raise blacklisted
+        if _is_wrong_type(session):
+            return bool(blacklisted), _decode_session(await async_redis_binary_client.get(session_key))
+        if isinstance(session, Exception):
+            raise session
+        return bool(blacklisted), _decode_session_hash(session)
+    except Exception as e:
+        _redis_error("load_auth_context_async", e)
+        return False, None
+
+
+@_with_redis(False)
+async def logout_async(token: str, expiry_seconds: int, user_id: int) -> bool:
+    """Async version of logout."""
+    try:
+        key = _blacklist_key(token)
+        _forget_not_blacklisted(key)
+        await _logout_script_async(keys=[key, _session_key(user_id)], args=[expiry_seconds])
+        return True
+    except Exception as e:
+        _redis_error("logout_async", e)
+        return False
+
+
+@_with_redis(None)
+async def consume_migration_code_async(code: str) -> Optional[str]:
+    """Async version of consume_migration_code."""
+    try:
+        return await _consume_script_async(keys=[_migration_key(code)])
+    except Exception as e:
+        _redis_error("consume_migration_code_async", e)
+        return None
+
+
+# ===== SEMANTIC RESPONSE CACHE =====
+
+# RediSearch HNSW index over cached LLM answers, one hash per (thread_id, context, prompt)
+SEMANTIC_CACHE_INDEX = "idx:semantic_cache_v2"
+SEMANTIC_CACHE_PREFIX = "semcache2:"
+SEMANTIC_CACHE_DIM = 1536  # text-embedding-3-small
+
+_semantic_index_ready = False
+# Set once the server rejects the index (no RediSearch module): the cache stays off
+_semantic_index_unsupported = False
+
+
+def _to_vector_bytes(vector: List[float]) -> bytes:
+    """Pack an embedding as FLOAT32 bytes, the layout the vector index expects."""
+    return array("f", vector).tobytes()
+
+
+def _escape_tag(value: str) -> str:
+    """Escape characters that have meaning inside a RediSearch TAG query."""
+    return re.sub(r"([^\w])", r"\\\1", value)
+
+
+@_with_redis(False)
+def ensure_semantic_cache_index() -> bool:
+    """
+    Create the semantic cache vector index if it doesn't exist yet.
+
+    A server that rejects the index commands (no RediSearch) is remembered, so later
+    calls return False without another round-trip.
+
+    Returns:
+        True if the index is ready, False if Redis (or RediSearch) is unavailable
+    """
+    global _semantic_index_ready, _semantic_index_unsupported
+
+    if _semantic_index_ready:
+        return True
+    if _semantic_index_unsupported:
+        return False
+
+    try:
+        index = redis_client.ft(SEMANTIC_CACHE_INDEX)
+        try:
+            index.info()
+        except redis.ResponseError:
+            index.create_index(
+                [
+                    TagField("thread_id"),
+                    TagField("context"),
+                    TextField("prompt"),
+                    VectorField(
+                        "embedding",
+                        "HNSW",
+                        {"TYPE": "FLOAT32", "DIM": SEMANTIC_CACHE_DIM, "DISTANCE_METRIC": "COSINE"},
+                    ),
+                ],
+                definition=IndexDefinition(prefix=[SEMANTIC_CACHE_PREFIX], index_type=IndexType.HASH),
+            )
+        _semantic_index_ready = True
+        return True
+    except redis.ResponseError as e:
+        # Not a connection problem: retrying on every turn would fail the same way
+        _semantic_index_unsupported = True
+        logger.warning("Semantic cache disabled, vector index unavailable: %s", e)
+        return False
+    except Exception as e:
+        _redis_error("ensure_semantic_cache_index", e)
+        return False
+
+
+@_with_redis(None)
+def semantic_cache_lookup(thread_id: str, context: str, vector: List[float], max_distance: float = 0.08) -> Optional[str]:
+    """
+    Find a cached answer for a semantically similar prompt from the same thread and context.
+
+    Args:
+        thread_id: Conversation/user namespace (results never cross users)
+        context: Opaque tag for what the answer may depend on besides the prompt;
+            only entries stored with the same context can hit
+        vector: Embedding of the incoming prompt
+        max_distance: Maximum cosine distance to count as a hit (0.08 ~ 0.92 similarity)
+
+    Returns:
+        Cached response text on a hit, None otherwise
+    """
+    if not ensure_semantic_cache_index():
+        return None
+
+    try:
+        query = (
+            Query(
+                f"(@thread_id:{{{_escape_tag(thread_id)}}} @context:{{{_escape_tag(context)}}})"
+                "=>[KNN 1 @embedding $vec AS distance]"
+            )
+            .return_fields("response", "distance")
+            .dialect(2)
+        )
+        result = redis_client.ft(SEMANTIC_CACHE_INDEX).search(
+            query, query_params={"vec": _to_vector_bytes(vector)}
+        )
+        if result.docs and float(result.docs[0].distance) < max_distance:
+            return result.docs[0].response
+        return None
+    except Exception as e:
+        _redis_error("semantic_cache_lookup", e)
+        return None
+
+
+@_with_redis(False)
+def semantic_cache_store(thread_id: str, context: str, prompt: str, vector: List[float], response: str, ttl: int = 86400) -> bool:
+    """
+    Cache an LLM answer under its prompt embedding.
+
+    Args:
+        thread_id: Conversation/user namespace
+        context: Context tag the answer was produced under (see semantic_cache_lookup)
+        prompt: The user's message text
+        vector: Embedding of the prompt
+        response: The LLM's answer to cache
+        ttl: Time to live in seconds (default 1 day)
+
+    Returns:
+        True if successful, False if Redis unavailable
+    """
+    if not ensure_semantic_cache_index():
         return False
 
     try:
-        redis_client.delete(f"migration_code:{code}")
+        digest = hashlib.sha1(f"{context}\0{prompt}".encode()).hexdigest()
+        key = f"{SEMANTIC_CACHE_PREFIX}{thread_id}:{digest}"
+        pipe = redis_client.pipeline(transaction=False)
+        pipe.hset(key, mapping={
+            "thread_id": thread_id,
+            "context": context,
+            "prompt": prompt,
+            "response": response,
+            "embedding": _to_vector_bytes(vector),
+        })
+        pipe.expire(key, ttl)
+        pipe.execute()
         return True
     except Exception as e:
-        print(f"Redis error in delete_migration_code: {e}")
+        _redis_error("semantic_cache_store", e)
         return False
@@ -0,0 +1,31 @@
+"""
+Shared environment configuration.
+
+Loads .env once on first import; scripts import settings from here instead of
+each calling load_dotenv() and os.getenv() themselves.
+"""
+
+import os
+from typing import Optional
+from urllib.parse import urlsplit
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Connection string for the Supabase (PostgreSQL) database
+DATABASE_URL = os.getenv("DATABASE_URL")
+
+def mask_db_url(url: Optional[str]) -> Optional[str]:
+    """Returns the URL with its password replaced by ****, for printing."""
+    if not url:
+        return url
+    parts = urlsplit(url)
+    # rpartition: the host is after the last '@', even if the password contains one
+    userinfo, at, hostport = parts.netloc.rpartition("@")
+    if at:
+        user = userinfo.split(":", 1)[0]
+        hostport = f"{user}:****@{hostport}" if ":" in userinfo else f"{user}@{hostport}"
+    return parts._replace(netloc=hostport).geturl()
+
+# DATABASE_URL with the password hidden, parsed once at import
+MASKED_DB_URL = mask_db_url(DATABASE_URL)
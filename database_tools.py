@@ -5,6 +5,20 @@ from typing import Optional
 from langchain_core.tools import tool 
 from models.budget import Budget
 from db_manager import record_transaction_db, get_spending_sum_db, get_expenses_by_date_db, get_weekly_breakdown_db, upsert_budget_db, get_budget_db, create_goal_db, get_goals_db
+from db_manager import (
+    create_recurring_expense_db, get_recurring_expenses_db, update_recurring_expense_db,
+    toggle_recurring_expense_db, delete_recurring_expense_db, forecast_recurring_expenses_db
+)
+
+# Recurring expense frequencies accepted by the recurring_expenses table
+_VALID_FREQ = frozenset({"daily", "weekly", "biweekly", "monthly", "yearly"})
+
+# (daily, weekly, monthly) multipliers per budget period; 30 days and ~4.3 weeks per month
+_BUDGET_FACTORS = {
+    "daily": (1.0, 7.0, 30.0),
+    "weekly": (1 / 7, 1.0, 4.3),
+    "monthly": (1 / 30, 1 / 4.3, 1.0),
+}
 
 
 # --- FINANCIAL AGENT TOOLS ---
@@ -65,8 +79,6 @@ def check_budget(user_id: str) -> str:
 @tool
 def get_daily_summary(user_id: str, current_budget: Budget) -> str:
     """Generates a formatted daily budget and spending summary for a proactive notification."""
-    from datetime import datetime
-
     # Get current date
     today = datetime.now().strftime("%A, %B %d, %Y")
 
@@ -140,26 +152,10 @@ def set_my_budget(
     'amount': The numeric value of the budget.
     'period': MUST be one of 'daily', 'weekly', or 'monthly'.
     """
-    period = period.lower()
-    daily = 0.0
-    weekly = 0.0
-    monthly = 0.0
-    
-    # Automatic Calculation Logic
-    if period == 'daily':
-        daily = amount
-        weekly = amount * 7
-        monthly = amount * 30
-    elif period == 'weekly':
-        weekly = amount
-        daily = amount / 7
-        monthly = amount * 4.3  # Approx weeks in a month
-    elif period == 'monthly':
-        monthly = amount
-        daily = amount / 30
-        weekly = amount / 4.3
-    else:
+    factors = _BUDGET_FACTORS.get(period.lower())
+    if not factors:
         return "Error: Period must be 'daily', 'weekly', or 'monthly'."
+    daily, weekly, monthly = amount * factors[0], amount * factors[1], amount * factors[2]
 
     # Save to Database
     success = upsert_budget_db(user_id, daily, weekly, monthly)
@@ -254,12 +250,9 @@ def add_recurring_expense(
     'start_date': When to start (YYYY-MM-DD). Defaults to today.
     'end_date': When to stop (YYYY-MM-DD). Leave empty for indefinite.
     """
-    from db_manager import create_recurring_expense_db
-
     # Validation
-    valid_frequencies = ['daily', 'weekly', 'biweekly', 'monthly', 'yearly']
-    if frequency.lower() not in valid_frequencies:
-        return f"Error: Frequency must be one of {valid_frequencies}."
+    if frequency.lower() not in _VALID_FREQ:
+        return "Error: Frequency must be one of 'daily', 'weekly', 'biweekly', 'monthly', 'yearly'."
 
     if amount <= 0:
         return "Error: Amount must be positive."
@@ -287,8 +280,6 @@ def view_recurring_expenses(
 
     'include_paused': Set to True to include paused/inactive recurring expenses.
     """
-    from db_manager import get_recurring_expenses_db
-
     active_only = not include_paused
     return get_recurring_expenses_db(user_id, active_only)
 
@@ -312,9 +303,7 @@ def edit_recurring_expense(
     'frequency': New frequency - 'daily', 'weekly', 'biweekly', 'monthly', 'yearly' (optional).
     'end_date': New end date in YYYY-MM-DD format (optional).
     """
-    from db_manager import update_recurring_expense_db
-
-    if frequency and frequency.lower() not in ['daily', 'weekly', 'biweekly', 'monthly', 'yearly']:
+    if frequency and frequency.lower() not in _VALID_FREQ:
         return "Error: Invalid frequency value."
 
     success, message = update_recurring_expense_db(
@@ -337,8 +326,6 @@ def pause_recurring_expense(
 
     'recurring_id': The ID number of the recurring expense to pause.
     """
-    from db_manager import toggle_recurring_expense_db
-
     success, message = toggle_recurring_expense_db(user_id, recurring_id, False)
 
     if success:
@@ -356,8 +343,6 @@ def resume_recurring_expense(
 
     'recurring_id': The ID number of the recurring expense to resume.
     """
-    from db_manager import toggle_recurring_expense_db
-
     success, message = toggle_recurring_expense_db(user_id, recurring_id, True)
 
     if success:
@@ -376,8 +361,6 @@ def delete_recurring_expense(
     'recurring_id': The ID number of the recurring expense to delete.
     WARNING: This action cannot be undone. Consider using pause_recurring_expense instead.
     """
-    from db_manager import delete_recurring_expense_db
-
     success, message = delete_recurring_expense_db(user_id, recurring_id)
 
     if success:
@@ -395,19 +378,25 @@ def forecast_recurring_expenses(
 
     'days': Number of days to forecast (default: 30).
     """
-    from db_manager import forecast_recurring_expenses_db
-
     if days < 1 or days > 365:
         return "Error: Days must be between 1 and 365."
 
     return forecast_recurring_expenses_db(user_id, days)
 
 # List of tools to be used by the LangGraph agent
-FINANCIAL_TOOLS = [
+FINANCIAL_TOOLS = (
     record_transaction, check_budget, get_daily_summary, get_expenses_by_date,
     get_weekly_breakdown, set_my_budget, set_financial_goal, check_goals,
     # Recurring expense tools
     add_recurring_expense, view_recurring_expenses, edit_recurring_expense,
     pause_recurring_expense, resume_recurring_expense, delete_recurring_expense,
     forecast_recurring_expenses
-]
\ No newline at end of file
+)
+
+# The tools above that write to the database (a subset of FINANCIAL_TOOLS); keep in sync
+# when adding a tool, since the planner cache must never replay a turn that ran one
+WRITE_TOOLS = (
+    record_transaction, set_my_budget, set_financial_goal,
+    add_recurring_expense, edit_recurring_expense, pause_recurring_expense,
+    resume_recurring_expense, delete_recurring_expense
+)
@@ -1,22 +1,113 @@
 import os
-import psycopg2
-from dotenv import load_dotenv
-from typing import Optional, Dict
-
-load_dotenv()
-
-# Get connection string from .env
-DATABASE_URL = os.getenv("DATABASE_URL")
+import threading
+from contextlib import contextmanager
+from functools import lru_cache
+from collections import namedtuple
+from itertools import product
+from psycopg.sql import SQL, Composed, Identifier
+from psycopg.pq import TransactionStatus
+from psycopg.rows import class_row, namedtuple_row
+from psycopg.types.json import Jsonb
+from psycopg_pool import ConnectionPool
+from cachetools import TTLCache
+from typing import Iterator, Optional, Dict
+from config import DATABASE_URL
+
+DB_POOL_MIN = int(os.getenv("DB_POOL_MIN", "2"))
+DB_POOL_MAX = int(os.getenv("DB_POOL_MAX", "20"))
+# Set PGBOUNCER_MODE=transaction behind a transaction-pooling proxy (e.g. Supabase's
+# pooler on port 6543): server-side prepared statements don't survive across its backends.
+PGBOUNCER_MODE = os.getenv("PGBOUNCER_MODE", "").lower()
+# execute(prepare=...) for the hottest statements: prepared on first use instead of waiting
+# for prepare_threshold; None leaves it to the threshold (disabled under PgBouncer).
+_PREPARE_HOT: Optional[bool] = None if PGBOUNCER_MODE == "transaction" else True
+
+# Shared connection pool, created on first use so importing this module never connects
+_POOL: Optional[ConnectionPool] = None
+_POOL_LOCK = threading.Lock()
+
+def _get_pool() -> ConnectionPool:
+    """Returns the process-wide connection pool, creating it on first call."""
+    global _POOL
+    if _POOL is None:
+        with _POOL_LOCK:
+            if _POOL is None:
+                if not DATABASE_URL:
+                    raise ConnectionError("DATABASE_URL not set in environment variables.")
+                # We use the connection string obtained from Supabase (PostgreSQL).
+                # prepare_threshold=2: a query executed twice on a connection becomes a
+                # server-side prepared statement, so repeat calls skip parse/plan
+                # (None disables preparing when PgBouncer runs in transaction mode).
+                # TCP keepalives stop idle pooled connections being dropped by NAT/proxies.
+                _POOL = ConnectionPool(
+                    DATABASE_URL,
+                    min_size=DB_POOL_MIN,
+                    max_size=DB_POOL_MAX,
+                    kwargs={
+                        "prepare_threshold": None if PGBOUNCER_MODE == "transaction" else 2,
+                        "keepalives": 1,
+                        "keepalives_idle": 60,
+                    },
+                    configure=_configure_connection,
+                    open=True
+                )
+    return _POOL
+
+# Upper bound for any single statement, so a hung query can't pin a pooled connection
+STATEMENT_TIMEOUT = os.getenv("DB_STATEMENT_TIMEOUT", "3s")
+
+def _configure_connection(conn) -> None:
+    """Applies per-session settings once, when the pool opens a new connection."""
+    conn.execute("SELECT set_config('statement_timeout', %s, false)", (STATEMENT_TIMEOUT,))
+    conn.commit()
+
+def close_db_pool() -> None:
+    """Closes the pool and its connections, e.g. on shutdown. A later call recreates it."""
+    global _POOL
+    with _POOL_LOCK:
+        pool, _POOL = _POOL, None
+    if pool is not None:
+        pool.close()
 
 def get_db_connection():
-    """Establishes and returns a database connection using the environment variable."""
-    if not DATABASE_URL:
-        raise ConnectionError("DATABASE_URL not set in environment variables.")
+    """Borrows a connection from the pool. Return it with release_db_connection()."""
+    return _get_pool().getconn()
 
-    # We use the connection string obtained from Supabase (PostgreSQL)
-    conn = psycopg2.connect(DATABASE_URL)
-    return conn
+def release_db_connection(conn) -> None:
+    """Returns a borrowed connection to the pool."""
+    _get_pool().putconn(conn)
 
+@contextmanager
+def _pool_conn():
+    """Yields a pooled connection, rolling back on error and always returning it to the pool."""
+    conn = get_db_connection()
+    try:
+        yield conn
+    finally:
+        # Reads leave a transaction open; end it here rather than in the pool's reset
+        if not conn.closed and conn.info.transaction_status != TransactionStatus.IDLE:
+            conn.rollback()
+        release_db_connection(conn)
+
+@contextmanager
+def _readonly_conn():
+    """Like _pool_conn(), but the connection's transactions open as BEGIN READ ONLY."""
+    with _pool_conn() as conn:
+        # read_only rides on the BEGIN psycopg sends anyway, so it costs no extra round-trip
+        conn.read_only = True
+        try:
+            yield conn
+        finally:
+            if not conn.closed:
+                # COMMIT, not ROLLBACK: psycopg forgets its prepared statements on rollback
+                status = conn.info.transaction_status
+                if status == TransactionStatus.INTRANS:
+                    conn.commit()
+                elif status != TransactionStatus.IDLE:
+                    conn.rollback()
+                conn.read_only = None
+
+@lru_cache(maxsize=8192)
 def detect_user_type(user_id: str) -> tuple[bool, any]:
     """
     Determines if user_id belongs to a web user or Telegram user.
@@ -25,17 +116,37 @@ def detect_user_type(user_id: str) -> tuple[bool, any]:
     - For Telegram users: (False, string_value)
 
     Logic:
-    - Web user IDs are small integers (auto-increment, < 1,000,000)
+    - Web user IDs are small integers (auto-increment, < 1,000,000), written as plain
+      ASCII digits
     - Telegram chat_ids are large numbers (typically > 1,000,000) or non-numeric strings
+    - Anything else is treated as Telegram, including negative Telegram group chat_ids
+      such as "-1001234" and numeric IDs padded with whitespace (which int() would
+      have accepted and classified as web users)
+
+    Memoized: the same few IDs are classified on every tool call of a conversation.
     """
-    try:
-        user_id_val = int(user_id)
+    user_id_str = str(user_id)
+    # ASCII digits only: isdigit() alone is also true for e.g. "²", which int() rejects
+    if user_id_str.isascii() and user_id_str.isdigit():
+        user_id_val = int(user_id_str)
         if user_id_val < 1000000:
             return (True, user_id_val)  # Web user
-        else:
-            return (False, user_id)  # Telegram user (large number)
-    except ValueError:
-        return (False, user_id)  # Telegram user (non-numeric)
+    return (False, user_id)  # Telegram user (large number or non-numeric)
+
+def _by_user_column(query: str) -> Dict[bool, Composed]:
+    """
+    Composes `query` once for each user column, keyed like detect_user_type's is_web.
+    `{user_col}` in the query becomes web_user_id (True) or user_id (False).
+    """
+    return {
+        is_web: SQL(query).format(user_col=Identifier("web_user_id" if is_web else "user_id"))
+        for is_web in (True, False)
+    }
+
+_INSERT_TRANSACTION_SQL = _by_user_column("""
+    INSERT INTO transactions ({user_col}, amount, category, description, expense_date)
+    VALUES (%s, %s, %s, %s, %s);
+""")
 
 def record_transaction_db(user_id: str, amount: float, category: str, description: Optional[str] = None, expense_date: Optional[str] = None) -> bool:
     """Inserts a new transaction record into the database. Supports both Telegram (user_id) and web (web_user_id) users."""
@@ -44,379 +155,306 @@ def record_transaction_db(user_id: str, amount: float, category: str, descriptio
 
         # Default to today if no expense_date provided
         if expense_date is None:
-            expense_date = date.today().isoformat()
-
-        conn = get_db_connection()
-        cur = conn.cursor()
+            expense_date = date.today()
 
         # Determine user type and get processed ID value
         is_web, processed_id = detect_user_type(user_id)
 
-        if is_web:
-            # Web user - insert into web_user_id column
-            sql = """
-                INSERT INTO transactions (web_user_id, amount, category, description, expense_date)
-                VALUES (%s, %s, %s, %s, %s);
-            """
-            cur.execute(sql, (processed_id, amount, category, description, expense_date))
-        else:
-            # Telegram user - insert into user_id column
-            sql = """
-                INSERT INTO transactions (user_id, amount, category, description, expense_date)
-                VALUES (%s, %s, %s, %s, %s);
-            """
-            cur.execute(sql, (processed_id, amount, category, description, expense_date))
-
-        conn.commit()
-        cur.close()
-        conn.close()
+        with _pool_conn() as conn:
+            cur = conn.cursor()
+            cur.execute(_INSERT_TRANSACTION_SQL[is_web], (processed_id, amount, category, description, expense_date))
+            conn.commit()
+            cur.close()
         return True
     except Exception as e:
         print(f"Database Error on insert: {e}")
         return False
 
+# Spending-sum SQL for every (is_web, has_category, period) combination, built once at
+# import so each call just looks up a fixed statement (which psycopg can then prepare)
+_PERIOD_KIND = {"day": "day", "daily": "day", "week": "week", "weekly": "week"}
+_PERIOD_FILTERS = {
+    None: "",
+    "day": " AND expense_date = CURRENT_DATE",
+    "week": " AND expense_date >= %s",  # Monday of the current week
+}
+_SPENDING_SQL = {
+    (is_web, has_cat, kind): _by_user_column(
+        "SELECT COALESCE(SUM(amount), 0) FROM transactions WHERE {user_col} = %s"
+        + (" AND category ILIKE %s" if has_cat else "")
+        + _PERIOD_FILTERS[kind] + ";"
+    )[is_web]
+    for is_web, has_cat, kind in product((True, False), (True, False), _PERIOD_FILTERS)
+}
+
 def get_spending_sum_db(user_id: str, period: str, category: Optional[str] = None) -> float:
     """Queries the database to get the sum of spending for a given period."""
     try:
-        from datetime import datetime, timedelta
-
-        conn = get_db_connection()
-        cur = conn.cursor()
-
-        # Define time filters based on the required period
-        # Store time filter parameters separately for proper ordering
-        time_filter = ""
-        time_params = []
-        if period == "day":
-            time_filter = "AND expense_date = CURRENT_DATE"
-        elif period == "week":
-            # Calculate Monday of current week (same logic as get_weekly_breakdown_db)
-            today = datetime.now()
-            days_since_monday = today.weekday()  # 0 = Monday, 6 = Sunday
-            monday = today - timedelta(days=days_since_monday)
-            monday_str = monday.strftime("%Y-%m-%d")
-            # Use parameterized query to prevent SQL injection
-            time_filter = "AND expense_date >= %s"
-            time_params.append(monday_str)
-        elif period == "daily":
-            # Alias for "day"
-            time_filter = "AND expense_date = CURRENT_DATE"
-        elif period == "weekly":
-            # Alias for "week"
-            today = datetime.now()
-            days_since_monday = today.weekday()
-            monday = today - timedelta(days=days_since_monday)
-            monday_str = monday.strftime("%Y-%m-%d")
-            # Use parameterized query to prevent SQL injection
-            time_filter = "AND expense_date >= %s"
-            time_params.append(monday_str)
-
-        # Build parameterized query to prevent SQL injection
+        from datetime import date, timedelta
+
         # Support both Telegram users (user_id) and web users (web_user_id)
-        # Build params in the correct order: user_filter, category_filter, time_filter
-        params = []
         is_web, processed_id = detect_user_type(user_id)
-
-        if is_web:
-            user_filter = "web_user_id = %s"
-            params.append(processed_id)
-        else:
-            user_filter = "user_id = %s"
-            params.append(processed_id)
-
-        category_filter = ""
         # Only apply category filter if a specific category is requested
-        if category and category.lower() != 'all':
-            category_filter = "AND category ILIKE %s"
-            params.append(category)
-
-        # Add time filter parameters last
-        params.extend(time_params)
+        has_cat = bool(category) and category.lower() != 'all'
+        kind = _PERIOD_KIND.get(period)
 
-        # SQL query to sum the amounts (using expense_date, not transaction_date)
-        sql = f"""
-            SELECT COALESCE(SUM(amount), 0)
-            FROM transactions
-            WHERE {user_filter} {category_filter} {time_filter};
-        """
-        cur.execute(sql, tuple(params))
-
-        total_sum = cur.fetchone()[0]
-
-        cur.close()
-        conn.close()
+        # Params in the order of the SQL: user, category, time filter
+        params = [processed_id]
+        if has_cat:
+            params.append(category)
+        if kind == "week":
+            # Monday of current week (same logic as get_weekly_breakdown_db)
+            today = date.today()
+            params.append(today - timedelta(days=today.weekday()))
+
+        with _readonly_conn() as conn:
+            cur = conn.cursor()
+            cur.execute(_SPENDING_SQL[(is_web, has_cat, kind)], params)
+            total_sum = cur.fetchone()[0]
+            cur.close()
         return float(total_sum)
     except Exception as e:
         print(f"Database Error on query: {e}")
         return 0.0
 
 
+_EXPENSES_BY_DATE_SQL = _by_user_column("""
+    SELECT category, amount, description
+    FROM transactions
+    WHERE {user_col} = %s AND expense_date = %s
+    ORDER BY record_date ASC;
+""")
+
 def get_expenses_by_date_db(user_id: str, query_date: str) -> str:
     """Retrieves expenses for a specific date from the database. Supports both Telegram and web users."""
     try:
-        conn = get_db_connection()
-        cur = conn.cursor()
-
         # Support both Telegram users (user_id) and web users (web_user_id)
         is_web, processed_id = detect_user_type(user_id)
 
-        if is_web:
-            sql = """
-                SELECT category, amount, description
-                FROM transactions
-                WHERE web_user_id = %s AND expense_date = %s
-                ORDER BY record_date ASC;
-            """
-            cur.execute(sql, (processed_id, query_date))
-        else:
-            sql = """
-                SELECT category, amount, description
-                FROM transactions
-                WHERE user_id = %s AND expense_date = %s
-                ORDER BY record_date ASC;
-            """
-            cur.execute(sql, (processed_id, query_date))
+        # Format the output into a readable string for the LLM
+        lines = [f"Expenses for {query_date}:"]
+        total = 0.0
 
-        rows = cur.fetchall()
-        
-        cur.close()
-        conn.close()
+        with _readonly_conn() as conn:
+            # Server-side cursor: rows arrive in batches of itersize and are
+            # formatted as they stream in, instead of buffering the whole day first
+            cur = conn.cursor(name="expenses_by_date")
+            cur.itersize = 256
+            cur.execute(_EXPENSES_BY_DATE_SQL[is_web], (processed_id, query_date))
 
-        if not rows:
+            for category, amount, description in cur:
+                amount = float(amount)
+                desc_str = f" ({description})" if description else ""
+                lines.append(f"- {category}: ₱{amount:,.2f}{desc_str}")
+                total += amount
+
+            cur.close()
+
+        if len(lines) == 1:
             return f"No expenses found for {query_date}."
 
-        # Format the output into a readable string for the LLM
-        report = f"Expenses for {query_date}:\n"
-        total = 0.0
-        for row in rows:
-            category, amount, description = row
-            desc_str = f" ({description})" if description else ""
-            report += f"- {category}: ₱{float(amount):,.2f}{desc_str}\n"
-            total += float(amount)
-        
-        report += f"\nTotal: ₱{total:,.2f}"
-        return report
+        lines.append(f"\nTotal: ₱{total:,.2f}")
+        return "\n".join(lines)
 
     except Exception as e:
         print(f"Database Error on query: {e}")
         return f"Error retrieving data: {str(e)}"
 
 
+# Budget limit and per-day totals for the whole week in one round-trip.
+# One row per day with spending; a single row with NULL date if there is none.
+_WEEKLY_BREAKDOWN_SQL = _by_user_column("""
+    SELECT b.daily_limit, t.expense_date, t.total
+    FROM (SELECT 1) AS one
+    LEFT JOIN budgets b ON b.{user_col} = %s
+    LEFT JOIN (
+        SELECT expense_date, SUM(amount) AS total
+        FROM transactions
+        WHERE {user_col} = %s AND expense_date BETWEEN %s AND %s
+        GROUP BY expense_date
+    ) t ON TRUE;
+""")
+
+_DAY_NAMES = ('Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday')
+
 def get_weekly_breakdown_db(user_id: str, week_start_date: str) -> str:
     """
     Retrieves daily expense totals for a full week (Mon-Sun) starting from week_start_date.
     week_start_date should be a Monday in YYYY-MM-DD format. Supports both Telegram and web users.
     """
     try:
-        from datetime import datetime, timedelta
-
-        conn = get_db_connection()
-        cur = conn.cursor()
+        from datetime import date, timedelta
 
         # Parse the start date
-        start = datetime.strptime(week_start_date, "%Y-%m-%d")
+        start = date.fromisoformat(week_start_date)
+        end = start + timedelta(days=6)
 
         # Determine if this is a web user or Telegram user
         is_web_user, processed_id = detect_user_type(user_id)
 
-        # Get user's daily budget limit for comparison
-        if is_web_user:
-            budget_sql = "SELECT daily_limit FROM budgets WHERE web_user_id = %s;"
-            cur.execute(budget_sql, (processed_id,))
-        else:
-            budget_sql = "SELECT daily_limit FROM budgets WHERE user_id = %s;"
-            cur.execute(budget_sql, (processed_id,))
+        with _readonly_conn() as conn:
+            cur = conn.cursor()
+            cur.execute(_WEEKLY_BREAKDOWN_SQL[is_web_user], (processed_id, processed_id, start, end))
+            rows = cur.fetchall()
+            cur.close()
 
-        budget_row = cur.fetchone()
-        daily_limit = float(budget_row[0]) if budget_row else 0.0
+        daily_limit = float(rows[0][0]) if rows and rows[0][0] is not None else 0.0
+        totals = {row[1]: float(row[2]) for row in rows if row[1] is not None}
 
         # Build report for all 7 days
-        report = f"📊 **Weekly Breakdown** ({week_start_date} to {(start + timedelta(days=6)).strftime('%Y-%m-%d')})\n\n"
+        lines = [f"📊 **Weekly Breakdown** ({week_start_date} to {end.isoformat()})\n"]
         week_total = 0.0
 
-        day_names = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
-
-        for i in range(7):
+        for i, day_name in enumerate(_DAY_NAMES):
             current_date = start + timedelta(days=i)
-            date_str = current_date.strftime("%Y-%m-%d")
-            day_name = day_names[i]
-
-            # Query expenses for this specific day
-            if is_web_user:
-                sql = """
-                    SELECT COALESCE(SUM(amount), 0)
-                    FROM transactions
-                    WHERE web_user_id = %s AND expense_date = %s;
-                """
-                cur.execute(sql, (processed_id, date_str))
-            else:
-                sql = """
-                    SELECT COALESCE(SUM(amount), 0)
-                    FROM transactions
-                    WHERE user_id = %s AND expense_date = %s;
-                """
-                cur.execute(sql, (processed_id, date_str))
-
-            day_total = float(cur.fetchone()[0])
+            date_str = current_date.isoformat()
+
+            day_total = totals.get(current_date, 0.0)
             week_total += day_total
 
             # Format the line
             if day_total == 0:
-                report += f"{day_name} ({date_str}): ₱0.00\n"
+                lines.append(f"{day_name} ({date_str}): ₱0.00")
             else:
                 over_indicator = " ⚠️ OVER" if daily_limit > 0 and day_total > daily_limit else ""
-                report += f"{day_name} ({date_str}): ₱{day_total:,.2f}{over_indicator}\n"
-
-        report += f"\n**Week Total:** ₱{week_total:,.2f}"
+                lines.append(f"{day_name} ({date_str}): ₱{day_total:,.2f}{over_indicator}")
 
-        cur.close()
-        conn.close()
-        return report
+        lines.append(f"\n**Week Total:** ₱{week_total:,.2f}")
+        return "\n".join(lines)
 
     except Exception as e:
         print(f"Database Error on weekly breakdown: {e}")
         return f"Error retrieving weekly breakdown: {str(e)}"
 
 
+_UPSERT_BUDGET_SQL = _by_user_column("""
+    INSERT INTO budgets ({user_col}, daily_limit, weekly_limit, monthly_limit, updated_at)
+    VALUES (%s, %s, %s, %s, NOW())
+    ON CONFLICT ({user_col})
+    DO UPDATE SET
+        daily_limit = EXCLUDED.daily_limit,
+        weekly_limit = EXCLUDED.weekly_limit,
+        monthly_limit = EXCLUDED.monthly_limit,
+        updated_at = NOW();
+""")
+
+# Budget limits by (is_web, user id); a user without a budget is cached as None.
+# upsert_budget_db and migrate_telegram_user_data evict their users right away;
+# other workers see a change within the TTL.
+_BUDGET_CACHE = TTLCache(maxsize=2048, ttl=60)
+_budget_cache_lock = threading.Lock()
+_MISSING = object()
+
+def _forget_budget(key: tuple) -> None:
+    with _budget_cache_lock:
+        _BUDGET_CACHE.pop(key, None)
+
 def upsert_budget_db(user_id: str, daily: float, weekly: float, monthly: float) -> bool:
     """Updates the budget limits for a user. Supports both Telegram and web users."""
     try:
-        conn = get_db_connection()
-        cur = conn.cursor()
-
         # Determine if this is a web user or Telegram user
         is_web, processed_id = detect_user_type(user_id)
-        
-        if is_web:
-            sql = """
-                INSERT INTO budgets (web_user_id, daily_limit, weekly_limit, monthly_limit, updated_at)
-                VALUES (%s, %s, %s, %s, NOW())
-                ON CONFLICT (web_user_id)
-                DO UPDATE SET
-                    daily_limit = EXCLUDED.daily_limit,
-                    weekly_limit = EXCLUDED.weekly_limit,
-                    monthly_limit = EXCLUDED.monthly_limit,
-                    updated_at = NOW();
-            """
-            cur.execute(sql, (processed_id, daily, weekly, monthly))
-        else:
-            # Telegram user - use user_id column
-            sql = """
-                INSERT INTO budgets (user_id, daily_limit, weekly_limit, monthly_limit, updated_at)
-                VALUES (%s, %s, %s, %s, NOW())
-                ON CONFLICT (user_id)
-                DO UPDATE SET
-                    daily_limit = EXCLUDED.daily_limit,
-                    weekly_limit = EXCLUDED.weekly_limit,
-                    monthly_limit = EXCLUDED.monthly_limit,
-                    updated_at = NOW();
-            """
-            cur.execute(sql, (user_id, daily, weekly, monthly))
 
-        conn.commit()
-        cur.close()
-        conn.close()
+        with _pool_conn() as conn:
+            cur = conn.cursor()
+
+            cur.execute(_UPSERT_BUDGET_SQL[is_web], (processed_id, daily, weekly, monthly))
+
+            conn.commit()
+            cur.close()
+        _forget_budget((is_web, processed_id))
         return True
     except Exception as e:
         print(f"Database Error on upsert_budget: {e}")
         return False
 
+_GET_BUDGET_SQL = _by_user_column(
+    "SELECT daily_limit, weekly_limit, monthly_limit FROM budgets WHERE {user_col} = %s"
+)
+
 def get_budget_db(user_id: str):
     """Retrieves the current budget limits for a user. Supports both Telegram and web users."""
     try:
-        conn = get_db_connection()
-        cur = conn.cursor()
-
         # Support both Telegram users (user_id) and web users (web_user_id)
         is_web, processed_id = detect_user_type(user_id)
+        key = (is_web, processed_id)
 
-        if is_web:
-            cur.execute("SELECT daily_limit, weekly_limit, monthly_limit FROM budgets WHERE web_user_id = %s", (processed_id,))
-        else:
-            cur.execute("SELECT daily_limit, weekly_limit, monthly_limit FROM budgets WHERE user_id = %s", (processed_id,))
+        with _budget_cache_lock:
+            cached = _BUDGET_CACHE.get(key, _MISSING)
+        if cached is not _MISSING:
+            return dict(cached) if cached else None
 
-        row = cur.fetchone()
+        with _readonly_conn() as conn:
+            cur = conn.cursor()
+            cur.execute(_GET_BUDGET_SQL[is_web], (processed_id,))
+            row = cur.fetchone()
 
-        cur.close()
-        conn.close()
+            cur.close()
 
-        if row:
-            return {"daily": float(row[0]), "weekly": float(row[1]), "monthly": float(row[2])}
-        return None
+        budget = {"daily": float(row[0]), "weekly": float(row[1]), "monthly": float(row[2])} if row else None
+        with _budget_cache_lock:
+            _BUDGET_CACHE[key] = budget
+        return dict(budget) if budget else None
     except Exception as e:
         print(f"Database Error on get_budget: {e}")
         return None
 
+_INSERT_GOAL_SQL = _by_user_column("""
+    INSERT INTO goals ({user_col}, goal_name, target_amount, deadline)
+    VALUES (%s, %s, %s, %s);
+""")
+
 def create_goal_db(user_id: str, name: str, target: float, deadline: str) -> tuple[bool, str]:
     """Creates a new financial goal. Returns (Success, Message). Supports both Telegram and web users."""
     try:
-        conn = get_db_connection()
-        cur = conn.cursor()
-
         # Determine if this is a web user or Telegram user
         is_web, processed_id = detect_user_type(user_id)
 
-        if is_web:
-            sql = """
-                INSERT INTO goals (web_user_id, goal_name, target_amount, deadline)
-                VALUES (%s, %s, %s, %s);
-            """
-            cur.execute(sql, (processed_id, name, target, deadline))
-        else:
-            sql = """
-                INSERT INTO goals (user_id, goal_name, target_amount, deadline)
-                VALUES (%s, %s, %s, %s);
-            """
-            cur.execute(sql, (processed_id, name, target, deadline))
+        with _pool_conn() as conn:
+            cur = conn.cursor()
+            cur.execute(_INSERT_GOAL_SQL[is_web], (processed_id, name, target, deadline))
 
-        conn.commit()
-        cur.close()
-        conn.close()
+            conn.commit()
+            cur.close()
         return True, "Goal created successfully."
     except Exception as e:
         error_msg = f"Database Error: {str(e)}"
         print(error_msg) # This prints to Cloud Run logs
         return False, error_msg # Return the specific error
 
+_GET_GOALS_SQL = _by_user_column("""
+    SELECT goal_name, target_amount::float8, current_amount::float8, deadline,
+           CASE WHEN target_amount > 0 THEN current_amount::float8 / target_amount::float8 * 100 ELSE 0 END
+    FROM goals
+    WHERE {user_col} = %s;
+""")
+
 def get_goals_db(user_id: str) -> str:
     """Retrieves all active goals for a user. Supports both Telegram and web users."""
     try:
-        conn = get_db_connection()
-        cur = conn.cursor()
-
         # Support both Telegram users (user_id) and web users (web_user_id)
         is_web, processed_id = detect_user_type(user_id)
 
-        if is_web:
-            sql = "SELECT goal_name, target_amount, current_amount, deadline FROM goals WHERE web_user_id = %s;"
-            cur.execute(sql, (processed_id,))
-        else:
-            sql = "SELECT goal_name, target_amount, current_amount, deadline FROM goals WHERE user_id = %s;"
-            cur.execute(sql, (processed_id,))
-
-        rows = cur.fetchall()
+        with _readonly_conn() as conn:
+            cur = conn.cursor()
+            cur.execute(_GET_GOALS_SQL[is_web], (processed_id,))
+            rows = cur.fetchall()
 
-        cur.close()
-        conn.close()
+            cur.close()
 
         if not rows:
             return "You have no active savings goals."
 
-        report = "🎯 **Your Financial Goals:**\n"
-        for row in rows:
-            name, target, current, deadline = row
-            target = float(target)
-            current = float(current)
+        parts = ["🎯 **Your Financial Goals:**\n"]
+        for name, target, current, deadline, progress in rows:
+            parts.append(
+                f"\n📌 **{name}**\n"
+                f"   Target: ₱{target:,.2f}\n"
+                f"   Saved: ₱{current:,.2f} ({progress:.1f}%)\n"
+                f"   Deadline: {deadline}\n"
+            )
 
-            # Progress calculation
-            progress = (current / target) * 100 if target > 0 else 0
-
-            report += f"\n📌 **{name}**\n"
-            report += f"   Target: ₱{target:,.2f}\n"
-            report += f"   Saved: ₱{current:,.2f} ({progress:.1f}%)\n"
-            report += f"   Deadline: {deadline}\n"
-
-        return report
+        return "".join(parts)
 
     except Exception as e:
         print(f"Database Error on get_goals: {e}")
@@ -424,6 +462,29 @@ def get_goals_db(user_id: str) -> str:
 
 # ===== RECURRING EXPENSES FUNCTIONS =====
 
+# next_occurrence is computed by Postgres: the first date of the series
+# start_date, +interval, +2*interval, ... that is not in the past.
+# Interval addition clamps month ends (Jan 31 -> Feb 28) like the old Python loop.
+_INSERT_RECURRING_SQL = _by_user_column("""
+    INSERT INTO recurring_expenses
+    ({user_col}, amount, category, description, frequency, start_date, end_date, next_occurrence)
+    SELECT %(uid)s, %(amount)s, %(category)s, %(description)s, %(frequency)s,
+           %(start)s, %(end)s,
+           (SELECT gs::date
+            FROM generate_series(%(start)s::date, GREATEST(%(start)s::date, CURRENT_DATE) + step, step) gs
+            WHERE gs >= CURRENT_DATE
+            ORDER BY gs
+            LIMIT 1)
+    FROM (SELECT CASE %(frequency)s
+        WHEN 'daily' THEN INTERVAL '1 day'
+        WHEN 'weekly' THEN INTERVAL '1 week'
+        WHEN 'biweekly' THEN INTERVAL '2 weeks'
+        WHEN 'monthly' THEN INTERVAL '1 month'
+        WHEN 'yearly' THEN INTERVAL '1 year'
+    END AS step) AS f
+    RETURNING recurring_id, next_occurrence;
+""")
+
 def create_recurring_expense_db(
     user_id: str,
     amount: float,
@@ -438,78 +499,30 @@ def create_recurring_expense_db(
     Returns (Success, Message/Error).
     """
     try:
-        from datetime import datetime, timedelta
-        import calendar
-
-        conn = get_db_connection()
-        cur = conn.cursor()
+        from datetime import date
 
         # Determine start_date
         if not start_date:
-            start_dt = datetime.now().date()
+            start_dt = date.today()
         else:
-            start_dt = datetime.strptime(start_date, "%Y-%m-%d").date()
-
-        # Calculate next_occurrence (first future occurrence)
-        today = datetime.now().date()
-        next_occ = start_dt
-
-        # If start_date is in the past, calculate the next future occurrence
-        while next_occ < today:
-            if frequency == 'daily':
-                next_occ += timedelta(days=1)
-            elif frequency == 'weekly':
-                next_occ += timedelta(weeks=1)
-            elif frequency == 'biweekly':
-                next_occ += timedelta(weeks=2)
-            elif frequency == 'monthly':
-                # Handle month-end edge cases
-                month = next_occ.month + 1
-                year = next_occ.year
-                if month > 12:
-                    month = 1
-                    year += 1
-                try:
-                    next_occ = next_occ.replace(year=year, month=month)
-                except ValueError:
-                    # Day doesn't exist in new month (e.g., Jan 31 -> Feb 31)
-                    last_day = calendar.monthrange(year, month)[1]
-                    next_occ = next_occ.replace(year=year, month=month, day=last_day)
-            elif frequency == 'yearly':
-                try:
-                    next_occ = next_occ.replace(year=next_occ.year + 1)
-                except ValueError:
-                    # Handle leap year edge case (Feb 29)
-                    next_occ = next_occ.replace(year=next_occ.year + 1, day=28)
+            start_dt = date.fromisoformat(start_date)
 
         # Insert into database - support both Telegram and web users
         is_web, processed_id = detect_user_type(user_id)
 
-        if is_web:
-            sql = """
-                INSERT INTO recurring_expenses
-                (web_user_id, amount, category, description, frequency, start_date, end_date, next_occurrence)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-                RETURNING recurring_id;
-            """
-            params = (processed_id, amount, category, description, frequency,
-                      start_dt.strftime("%Y-%m-%d"), end_date, next_occ.strftime("%Y-%m-%d"))
-        else:
-            sql = """
-                INSERT INTO recurring_expenses
-                (user_id, amount, category, description, frequency, start_date, end_date, next_occurrence)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-                RETURNING recurring_id;
-            """
-            params = (processed_id, amount, category, description, frequency,
-                      start_dt.strftime("%Y-%m-%d"), end_date, next_occ.strftime("%Y-%m-%d"))
+        params = {
+            "uid": processed_id, "amount": amount, "category": category,
+            "description": description, "frequency": frequency,
+            "start": start_dt, "end": end_date
+        }
 
-        cur.execute(sql, params)
-        recurring_id = cur.fetchone()[0]
+        with _pool_conn() as conn:
+            cur = conn.cursor()
+            cur.execute(_INSERT_RECURRING_SQL[is_web], params)
+            recurring_id, next_occ = cur.fetchone()
 
-        conn.commit()
-        cur.close()
-        conn.close()
+            conn.commit()
+            cur.close()
 
         # Provide feedback about next occurrence
         if next_occ > start_dt:
@@ -522,44 +535,47 @@ def create_recurring_expense_db(
         print(error_msg)
         return False, error_msg
 
+_RECURRING_LIST_SQL = {
+    active_only: f"""
+        SELECT recurring_id, category, amount, description, frequency,
+               next_occurrence, end_date, is_active
+        FROM recurring_expenses
+        WHERE user_id = %s {"AND is_active = TRUE" if active_only else ""}
+        ORDER BY next_occurrence ASC;
+    """
+    for active_only in (True, False)
+}
+
 def get_recurring_expenses_db(user_id: str, active_only: bool = True) -> str:
     """
     Retrieves all recurring expenses for a user.
     Returns formatted string for LLM.
     """
     try:
-        conn = get_db_connection()
-        cur = conn.cursor()
+        parts = ["📅 **Your Recurring Expenses:**\n\n"]
 
-        active_filter = "AND is_active = TRUE" if active_only else ""
+        with _readonly_conn() as conn:
+            # Server-side cursor, formatted while streaming (see get_expenses_by_date_db)
+            cur = conn.cursor(name="recurring_expenses")
+            cur.itersize = 256
+            cur.execute(_RECURRING_LIST_SQL[active_only], (user_id,))
 
-        sql = f"""
-            SELECT recurring_id, category, amount, description, frequency,
-                   next_occurrence, end_date, is_active
-            FROM recurring_expenses
-            WHERE user_id = %s {active_filter}
-            ORDER BY next_occurrence ASC;
-        """
-        cur.execute(sql, (user_id,))
-        rows = cur.fetchall()
+            for rec_id, cat, amt, desc, freq, next_occ, end_dt, active in cur:
+                status = "✅ Active" if active else "⏸️ Paused"
+                end_info = f" (until {end_dt})" if end_dt else " (indefinite)"
+                desc_str = f" - {desc}" if desc else ""
 
-        cur.close()
-        conn.close()
-
-        if not rows:
-            return "You have no recurring expenses set up."
+                parts.append(
+                    f"**#{rec_id}** {cat}: ₱{float(amt):,.2f}{desc_str}\n"
+                    f"   {freq.title()}{end_info} | Next: {next_occ} | {status}\n\n"
+                )
 
-        report = "📅 **Your Recurring Expenses:**\n\n"
-        for row in rows:
-            rec_id, cat, amt, desc, freq, next_occ, end_dt, active = row
-            status = "✅ Active" if active else "⏸️ Paused"
-            end_info = f" (until {end_dt})" if end_dt else " (indefinite)"
-            desc_str = f" - {desc}" if desc else ""
+            cur.close()
 
-            report += f"**#{rec_id}** {cat}: ₱{float(amt):,.2f}{desc_str}\n"
-            report += f"   {freq.title()}{end_info} | Next: {next_occ} | {status}\n\n"
+        if len(parts) == 1:
+            return "You have no recurring expenses set up."
 
-        return report
+        return "".join(parts)
 
     except Exception as e:
         print(f"Database Error on get_recurring_expenses: {e}")
@@ -579,54 +595,50 @@ def update_recurring_expense_db(
     Only updates provided fields (partial update).
     """
     try:
-        conn = get_db_connection()
-        cur = conn.cursor()
-
-        # Build dynamic UPDATE query
-        update_fields = []
-        params = []
-
-        if amount is not None:
-            update_fields.append("amount = %s")
-            params.append(amount)
-        if category is not None:
-            update_fields.append("category = %s")
-            params.append(category)
-        if description is not None:
-            update_fields.append("description = %s")
-            params.append(description)
-        if frequency is not None:
-            update_fields.append("frequency = %s")
-            params.append(frequency)
-        if end_date is not None:
-            update_fields.append("end_date = %s")
-            params.append(end_date)
-
-        if not update_fields:
-            return False, "No fields to update."
-
-        update_fields.append("updated_at = NOW()")
-        params.extend([user_id, recurring_id])
-
-        sql = f"""
-            UPDATE recurring_expenses
-            SET {', '.join(update_fields)}
-            WHERE user_id = %s AND recurring_id = %s
-            RETURNING recurring_id;
-        """
-
-        cur.execute(sql, params)
-        result = cur.fetchone()
-
-        if not result:
-            conn.rollback()
+        with _pool_conn() as conn:
+            cur = conn.cursor()
+
+            # Build dynamic UPDATE query
+            update_fields = []
+            params = []
+
+            if amount is not None:
+                update_fields.append("amount = %s")
+                params.append(amount)
+            if category is not None:
+                update_fields.append("category = %s")
+                params.append(category)
+            if description is not None:
+                update_fields.append("description = %s")
+                params.append(description)
+            if frequency is not None:
+                update_fields.append("frequency = %s")
+                params.append(frequency)
+            if end_date is not None:
+                update_fields.append("end_date = %s")
+                params.append(end_date)
+
+            if not update_fields:
+                return False, "No fields to update."
+
+            update_fields.append("updated_at = NOW()")
+            params.extend([user_id, recurring_id])
+
+            sql = f"""
+                UPDATE recurring_expenses
+                SET {', '.join(update_fields)}
+                WHERE user_id = %s AND recurring_id = %s;
+            """
+
+            cur.execute(sql, params)
+            # rowcount comes back with the UPDATE itself; committing an untouched
+            # transaction is as cheap as rolling it back
+            conn.commit()
+            updated = cur.rowcount
             cur.close()
-            conn.close()
-            return False, f"Recurring expense #{recurring_id} not found or access denied."
 
-        conn.commit()
-        cur.close()
-        conn.close()
+        if updated == 0:
+            return False, f"Recurring expense #{recurring_id} not found or access denied."
         return True, f"Recurring expense #{recurring_id} updated successfully."
 
     except Exception as e:
@@ -643,28 +655,22 @@ def toggle_recurring_expense_db(
     Pauses or resumes a recurring expense by setting is_active flag.
     """
     try:
-        conn = get_db_connection()
-        cur = conn.cursor()
+        with _pool_conn() as conn:
+            cur = conn.cursor()
 
-        sql = """
-            UPDATE recurring_expenses
-            SET is_active = %s, updated_at = NOW()
-            WHERE user_id = %s AND recurring_id = %s
-            RETURNING recurring_id;
-        """
-
-        cur.execute(sql, (set_active, user_id, recurring_id))
-        result = cur.fetchone()
+            sql = """
+                UPDATE recurring_expenses
+                SET is_active = %s, updated_at = NOW()
+                WHERE user_id = %s AND recurring_id = %s;
+            """
 
-        if not result:
-            conn.rollback()
+            cur.execute(sql, (set_active, user_id, recurring_id))
+            conn.commit()
+            updated = cur.rowcount
             cur.close()
-            conn.close()
-            return False, f"Recurring expense #{recurring_id} not found."
 
-        conn.commit()
-        cur.close()
-        conn.close()
+        if updated == 0:
+            return False, f"Recurring expense #{recurring_id} not found."
 
         action = "resumed" if set_active else "paused"
         return True, f"Recurring expense #{recurring_id} {action}."
@@ -679,27 +685,21 @@ def delete_recurring_expense_db(user_id: str, recurring_id: int) -> tuple[bool,
     Permanently deletes a recurring expense.
     """
     try:
-        conn = get_db_connection()
-        cur = conn.cursor()
-
-        sql = """
-            DELETE FROM recurring_expenses
-            WHERE user_id = %s AND recurring_id = %s
-            RETURNING recurring_id;
-        """
+        with _pool_conn() as conn:
+            cur = conn.cursor()
 
-        cur.execute(sql, (user_id, recurring_id))
-        result = cur.fetchone()
+            sql = """
+                DELETE FROM recurring_expenses
+                WHERE user_id = %s AND recurring_id = %s;
+            """
 
-        if not result:
-            conn.rollback()
+            cur.execute(sql, (user_id, recurring_id))
+            conn.commit()
+            deleted = cur.rowcount
             cur.close()
-            conn.close()
-            return False, f"Recurring expense #{recurring_id} not found."
 
-        conn.commit()
-        cur.close()
-        conn.close()
+        if deleted == 0:
+            return False, f"Recurring expense #{recurring_id} not found."
         return True, f"Recurring expense #{recurring_id} deleted permanently."
 
     except Exception as e:
@@ -707,6 +707,47 @@ def delete_recurring_expense_db(user_id: str, recurring_id: int) -> tuple[bool,
         print(error_msg)
         return False, error_msg
 
+_DUE_RECURRING_SQL = {
+    for_user: f"""
+        SELECT recurring_id, user_id, amount, category, description,
+               frequency, next_occurrence, end_date
+        FROM recurring_expenses
+        WHERE is_active = TRUE
+          AND next_occurrence <= CURRENT_DATE
+          {"AND user_id = %s" if for_user else ""}
+        ORDER BY next_occurrence ASC;
+    """
+    for for_user in (True, False)
+}
+
+_AUTO_TRANSACTION_SQL = """
+    INSERT INTO transactions (user_id, amount, category, description, expense_date)
+    VALUES (%s, %s, %s, %s, %s);
+"""
+
+# Advances next_occurrence by each row's frequency, deactivating rows whose new
+# next_occurrence is past their end_date
+_ADVANCE_RECURRING_SQL = """
+    UPDATE recurring_expenses
+    SET next_occurrence = next_occurrence + CASE frequency
+            WHEN 'daily' THEN INTERVAL '1 day'
+            WHEN 'weekly' THEN INTERVAL '1 week'
+            WHEN 'biweekly' THEN INTERVAL '2 weeks'
+            WHEN 'yearly' THEN INTERVAL '1 year'
+            ELSE INTERVAL '1 month'
+        END,
+        is_active = end_date IS NULL OR next_occurrence + CASE frequency
+            WHEN 'daily' THEN INTERVAL '1 day'
+            WHEN 'weekly' THEN INTERVAL '1 week'
+            WHEN 'biweekly' THEN INTERVAL '2 weeks'
+            WHEN 'yearly' THEN INTERVAL '1 year'
+            ELSE INTERVAL '1 month'
+        END <= end_date,
+        last_processed = CURRENT_DATE,
+        updated_at = NOW()
+    WHERE recurring_id = ANY(%s);
+"""
+
 def process_due_recurring_expenses_db(user_id: Optional[str] = None) -> tuple[int, str]:
     """
     Auto-processes all recurring expenses that are due.
@@ -719,86 +760,49 @@ def process_due_recurring_expenses_db(user_id: Optional[str] = None) -> tuple[in
         (count, message): Number of expenses processed and summary message.
     """
     try:
-        conn = get_db_connection()
-        cur = conn.cursor()
-
-        # Find all due recurring expenses
-        user_filter = "AND user_id = %s" if user_id else ""
-        params = [user_id] if user_id else []
-
-        sql = f"""
-            SELECT recurring_id, user_id, amount, category, description,
-                   frequency, next_occurrence, end_date
-            FROM recurring_expenses
-            WHERE is_active = TRUE
-              AND next_occurrence <= CURRENT_DATE
-              {user_filter}
-            ORDER BY next_occurrence ASC;
-        """
-
-        cur.execute(sql, params)
-        due_expenses = cur.fetchall()
-
-        if not due_expenses:
-            cur.close()
-            conn.close()
-            return 0, "No recurring expenses due for processing."
+        with _pool_conn() as conn:
+            cur = conn.cursor()
 
-        processed_count = 0
-        errors = []
+            # Find all due recurring expenses
+            params = [user_id] if user_id else []
+            cur.execute(_DUE_RECURRING_SQL[bool(user_id)], params)
+            due_expenses = cur.fetchall()
 
-        for expense in due_expenses:
-            rec_id, uid, amount, cat, desc, freq, next_occ, end_dt = expense
+            if not due_expenses:
+                cur.close()
+                return 0, "No recurring expenses due for processing."
+
+            # 1. Record every due transaction (with next_occurrence as expense_date)
+            insert_rows = [
+                (uid, amount, cat, f"[Auto] {desc}" if desc else "[Auto-recurring]", next_occ)
+                for _, uid, amount, cat, desc, _, next_occ, _ in due_expenses
+            ]
+            errors = []
 
             try:
-                # 1. Record the transaction (with next_occurrence as expense_date)
-                desc_text = f"[Auto] {desc}" if desc else "[Auto-recurring]"
-                insert_sql = """
-                    INSERT INTO transactions (user_id, amount, category, description, expense_date)
-                    VALUES (%s, %s, %s, %s, %s);
-                """
-                cur.execute(insert_sql, (uid, amount, cat, desc_text, next_occ))
-
-                # 2. Calculate next occurrence using SQL INTERVAL
-                frequency_map = {
-                    'daily': "next_occurrence + INTERVAL '1 day'",
-                    'weekly': "next_occurrence + INTERVAL '1 week'",
-                    'biweekly': "next_occurrence + INTERVAL '2 weeks'",
-                    'monthly': "next_occurrence + INTERVAL '1 month'",
-                    'yearly': "next_occurrence + INTERVAL '1 year'"
-                }
-                next_occ_calc = frequency_map.get(freq, "next_occurrence + INTERVAL '1 month'")
-
-                # 3. Update recurring_expenses with new next_occurrence
-                update_sql = f"""
-                    UPDATE recurring_expenses
-                    SET next_occurrence = {next_occ_calc},
-                        last_processed = CURRENT_DATE,
-                        updated_at = NOW()
-                    WHERE recurring_id = %s
-                    RETURNING next_occurrence;
-                """
-                cur.execute(update_sql, (rec_id,))
-                new_next_occ = cur.fetchone()[0]
-
-                # 4. Check if we've passed end_date, deactivate if so
-                if end_dt and new_next_occ > end_dt:
-                    deactivate_sql = """
-                        UPDATE recurring_expenses
-                        SET is_active = FALSE
-                        WHERE recurring_id = %s;
-                    """
-                    cur.execute(deactivate_sql, (rec_id,))
-
-                processed_count += 1
-
-            except Exception as inner_e:
-                errors.append(f"#{rec_id}: {str(inner_e)}")
-                continue
-
-        conn.commit()
-        cur.close()
-        conn.close()
+                # 2. Advance every row's next_occurrence in one UPDATE. Pipeline mode sends
+                # the inserts and the update back-to-back and waits for results once
+                with conn.pipeline():
+                    cur.executemany(_AUTO_TRANSACTION_SQL, insert_rows)
+                    cur.execute(_ADVANCE_RECURRING_SQL, ([row[0] for row in due_expenses],))
+                conn.commit()
+                processed_count = len(due_expenses)
+            except Exception as batch_error:
+                # One bad row fails the whole batch: redo it row by row so the others still
+                # go through and only the failing ones are reported
+                print(f"Recurring batch failed, retrying row by row: {batch_error}")
+                conn.rollback()
+                processed_count = 0
+                for row, insert_row in zip(due_expenses, insert_rows):
+                    try:
+                        with conn.transaction():
+                            cur.execute(_AUTO_TRANSACTION_SQL, insert_row)
+                            cur.execute(_ADVANCE_RECURRING_SQL, ([row[0]],))
+                        processed_count += 1
+                    except Exception as inner_e:
+                        errors.append(f"#{row[0]}: {str(inner_e)}")
+
+            cur.close()
 
         message = f"Processed {processed_count} recurring expense(s)."
         if errors:
@@ -817,100 +821,66 @@ def forecast_recurring_expenses_db(user_id: str, forecast_days: int = 30) -> str
     Used for budget forecasting.
     """
     try:
-        conn = get_db_connection()
-        cur = conn.cursor()
-
-        # Get all active recurring expenses
-        sql = """
-            SELECT recurring_id, category, amount, description, frequency,
-                   next_occurrence, end_date
-            FROM recurring_expenses
-            WHERE user_id = %s AND is_active = TRUE
-            ORDER BY next_occurrence ASC;
-        """
-        cur.execute(sql, (user_id,))
-        recurring = cur.fetchall()
-
-        cur.close()
-        conn.close()
-
-        if not recurring:
-            return "You have no active recurring expenses to forecast."
+        with _readonly_conn() as conn:
+            cur = conn.cursor()
 
-        # Python-side calculation of all occurrences within forecast period
-        from datetime import datetime, timedelta
-        import calendar
-
-        forecast_end = datetime.now().date() + timedelta(days=forecast_days)
-        forecast_items = []
-
-        for rec in recurring:
-            rec_id, cat, amt, desc, freq, next_occ, end_dt = rec
-
-            # Generate all occurrences for this expense
-            current_date = next_occ
-            while current_date <= forecast_end:
-                # Check if past end_date
-                if end_dt and current_date > end_dt:
-                    break
-
-                forecast_items.append({
-                    'date': current_date,
-                    'category': cat,
-                    'amount': float(amt),
-                    'description': desc or 'Recurring'
-                })
-
-                # Calculate next occurrence
-                if freq == 'daily':
-                    current_date += timedelta(days=1)
-                elif freq == 'weekly':
-                    current_date += timedelta(weeks=1)
-                elif freq == 'biweekly':
-                    current_date += timedelta(weeks=2)
-                elif freq == 'monthly':
-                    # Handle month-end edge cases
-                    month = current_date.month + 1
-                    year = current_date.year
-                    if month > 12:
-                        month = 1
-                        year += 1
-                    try:
-                        current_date = current_date.replace(year=year, month=month)
-                    except ValueError:
-                        # Day doesn't exist in new month (e.g., Jan 31 -> Feb 31)
-                        # Fall back to last day of month
-                        last_day = calendar.monthrange(year, month)[1]
-                        current_date = current_date.replace(year=year, month=month, day=last_day)
-                elif freq == 'yearly':
-                    try:
-                        current_date = current_date.replace(year=current_date.year + 1)
-                    except ValueError:
-                        # Handle leap year edge case (Feb 29)
-                        current_date = current_date.replace(year=current_date.year + 1, day=28)
-                else:
-                    break  # Unknown frequency
+            # Expand every active recurring expense into its occurrences within the
+            # forecast window. LEFT JOIN keeps expenses with no occurrence in the
+            # window (occ_date NULL), to tell "nothing scheduled" from "nothing set up".
+            sql = """
+                SELECT r.category, r.amount, r.description, gs::date AS occ_date
+                FROM recurring_expenses r
+                LEFT JOIN LATERAL generate_series(
+                    r.next_occurrence,
+                    LEAST(COALESCE(r.end_date, CURRENT_DATE + %s), CURRENT_DATE + %s),
+                    CASE r.frequency
+                        WHEN 'daily' THEN INTERVAL '1 day'
+                        WHEN 'weekly' THEN INTERVAL '1 week'
+                        WHEN 'biweekly' THEN INTERVAL '2 weeks'
+                        WHEN 'monthly' THEN INTERVAL '1 month'
+                        WHEN 'yearly' THEN INTERVAL '1 year'
+                    END
+                ) gs ON TRUE
+                WHERE r.user_id = %s AND r.is_active = TRUE
+                ORDER BY gs, r.next_occurrence;
+            """
+            cur.execute(sql, (forecast_days, forecast_days, user_id))
+            rows = cur.fetchall()
 
-        # Sort by date
-        forecast_items.sort(key=lambda x: x['date'])
+            cur.close()
+
+        if not rows:
+            return "You have no active recurring expenses to forecast."
+
+        forecast_items = [
+            {
+                'date': occ_date,
+                'category': cat,
+                'amount': float(amt),
+                'description': desc or 'Recurring'
+            }
+            for cat, amt, desc, occ_date in rows
+            if occ_date is not None
+        ]
 
         # Format output
-        report = f"📊 **Recurring Expense Forecast (Next {forecast_days} days):**\n\n"
+        header = f"📊 **Recurring Expense Forecast (Next {forecast_days} days):**\n"
 
         if not forecast_items:
-            return report + "No recurring expenses scheduled in this period."
+            return header + "\nNo recurring expenses scheduled in this period."
 
         total_forecast = sum(item['amount'] for item in forecast_items)
 
+        lines = [header]
         for item in forecast_items:
-            report += f"• {item['date']} - {item['category']}: ₱{item['amount']:,.2f}"
+            line = f"• {item['date']} - {item['category']}: ₱{item['amount']:,.2f}"
             if item['description'] != 'Recurring':
-                report += f" ({item['description']})"
-            report += "\n"
+                line += f" ({item['description']})"
+            lines.append(line)
 
-        report += f"\n**Total Forecasted: ₱{total_forecast:,.2f}**"
+        lines.append(f"\n**Total Forecasted: ₱{total_forecast:,.2f}**")
 
-        return report
+        return "\n".join(lines)
 
     except Exception as e:
         print(f"Database Error on forecast: {e}")
@@ -919,6 +889,53 @@ def forecast_recurring_expenses_db(user_id: str, forecast_days: int = 30) -> str
 
 # ===== USER AUTHENTICATION FUNCTIONS =====
 
+# User rows by id and by email, so repeat auth lookups skip the database.
+# Misses are cached separately for a shorter time to absorb probing for unknown accounts.
+# create_user and update_user_last_login evict through invalidate_user().
+_USER_BY_ID_CACHE = TTLCache(maxsize=4096, ttl=300)
+_USER_BY_EMAIL_CACHE = TTLCache(maxsize=4096, ttl=300)
+_USER_MISS_CACHE = TTLCache(maxsize=4096, ttl=30)
+_user_cache_lock = threading.Lock()
+
+# Row type of get_user_by_id, also built from get_user_by_email rows to prefill its cache
+UserRef = namedtuple("UserRef", "user_id email")
+
+def _cached_user(cache: TTLCache, key) -> object:
+    """Returns the cached row, None for a cached miss, or _MISSING if nothing is cached."""
+    with _user_cache_lock:
+        user = cache.get(key[1], _MISSING)
+        if user is _MISSING and key in _USER_MISS_CACHE:
+            return None
+    return user
+
+def _remember_user(cache: TTLCache, key, user: Optional[tuple], id_entry: Optional[tuple]) -> None:
+    with _user_cache_lock:
+        if user is None:
+            _USER_MISS_CACHE[key] = True
+            return
+        cache[key[1]] = user
+        if id_entry is not None:
+            _USER_BY_ID_CACHE[id_entry[0]] = id_entry
+
+def invalidate_user(user_id: Optional[int] = None, email: Optional[str] = None) -> None:
+    """
+    Drops a user from the in-process user caches after their record changes.
+
+    Args:
+        user_id: User's database ID, if known
+        email: User's email address, if known
+    """
+    with _user_cache_lock:
+        if user_id is not None:
+            cached = _USER_BY_ID_CACHE.pop(user_id, None)
+            _USER_MISS_CACHE.pop(("id", user_id), None)
+            if email is None and cached is not None:
+                email = cached[1]
+        if email is not None:
+            email = email.lower()
+            _USER_BY_EMAIL_CACHE.pop(email, None)
+            _USER_MISS_CACHE.pop(("email", email), None)
+
 def create_user(email: str, password_hash: str = None, google_id: str = None) -> Optional[int]:
     """
     Creates a new user account.
@@ -929,49 +946,81 @@ def create_user(email: str, password_hash: str = None, google_id: str = None) ->
         google_id: Google OAuth user ID (for Google auth)
 
     Returns:
-        user_id if successful, None otherwise
+        user_id if successful, None otherwise (including when the email is already registered)
+    """
+    result = get_or_create_user(email, password_hash, google_id)
+    if result is None or not result[1]:
+        return None
+    return result[0]
+
+
+# Existing accounts keep their password; only a missing google_id is filled in on Google sign-in.
+# xmax is 0 only on a freshly inserted row, which tells insert from conflict in the same round-trip.
+# Arbiter is migration 005's lower(email) index, so "A@x.com" finds the "a@x.com" account
+_GET_OR_CREATE_USER_SQL = """
+    INSERT INTO users (email, password_hash, google_id, created_at)
+    VALUES (%s, %s, %s, NOW())
+    ON CONFLICT ((lower(email))) DO UPDATE
+        SET google_id = COALESCE(users.google_id, EXCLUDED.google_id)
+    RETURNING user_id, (xmax = 0) AS is_new;
+"""
+
+def get_or_create_user(email: str, password_hash: str = None, google_id: str = None) -> Optional[tuple]:
+    """
+    Creates a user account, or returns the existing one for this email.
+
+    Replaces a get_user_by_email + create_user pair on sign-in paths with one statement.
+
+    Args:
+        email: User's email address (required)
+        password_hash: Bcrypt hashed password, only stored for a new account
+        google_id: Google OAuth user ID, stored if the account has none yet
+
+    Returns:
+        Tuple of (user_id, is_new) if successful, None otherwise
     """
     try:
-        conn = get_db_connection()
-        cur = conn.cursor()
-
-        sql = """
-            INSERT INTO users (email, password_hash, google_id, created_at)
-            VALUES (%s, %s, %s, NOW())
-            RETURNING user_id;
-        """
-        cur.execute(sql, (email, password_hash, google_id))
-        user_id = cur.fetchone()[0]
-
-        conn.commit()
-        cur.close()
-        conn.close()
-        return user_id
+        with _pool_conn() as conn:
+            cur = conn.cursor()
+
+            cur.execute(_GET_OR_CREATE_USER_SQL, (email, password_hash, google_id))
+            user_id, is_new = cur.fetchone()
+
+            conn.commit()
+            cur.close()
+        invalidate_user(user_id, email)
+        return user_id, is_new
     except Exception as e:
-        print(f"Database Error on create_user: {e}")
+        print(f"Database Error on get_or_create_user: {e}")
         return None
 
 
 def get_user_by_email(email: str) -> Optional[tuple]:
     """
-    Retrieves user by email address.
+    Retrieves user by email address, ignoring case.
 
     Args:
         email: User's email address
 
     Returns:
-        Tuple of (user_id, email, password_hash, google_id) if found, None otherwise
+        Named tuple (user_id, email, password_hash, google_id) if found, None otherwise
     """
     try:
-        conn = get_db_connection()
-        cur = conn.cursor()
+        key = ("email", email.lower())
+        user = _cached_user(_USER_BY_EMAIL_CACHE, key)
+        if user is not _MISSING:
+            return user
+
+        with _readonly_conn() as conn:
+            cur = conn.cursor(row_factory=namedtuple_row)
 
-        sql = "SELECT user_id, email, password_hash, google_id FROM users WHERE email = %s;"
-        cur.execute(sql, (email,))
-        user = cur.fetchone()
+            # Matches the lower(email) index from migration 005
+            sql = "SELECT user_id, email, password_hash, google_id FROM users WHERE lower(email) = %s;"
+            cur.execute(sql, (key[1],), prepare=_PREPARE_HOT)
+            user = cur.fetchone()
 
-        cur.close()
-        conn.close()
+            cur.close()
+        _remember_user(_USER_BY_EMAIL_CACHE, key, user, UserRef(user.user_id, user.email) if user else None)
         return user
     except Exception as e:
         print(f"Database Error on get_user_by_email: {e}")
@@ -986,18 +1035,23 @@ def get_user_by_id(user_id: int) -> Optional[tuple]:
         user_id: User's database ID
 
     Returns:
-        Tuple of (user_id, email) if found, None otherwise
+        UserRef(user_id, email) if found, None otherwise
     """
     try:
-        conn = get_db_connection()
-        cur = conn.cursor()
+        key = ("id", user_id)
+        user = _cached_user(_USER_BY_ID_CACHE, key)
+        if user is not _MISSING:
+            return user
+
+        with _readonly_conn() as conn:
+            cur = conn.cursor(row_factory=class_row(UserRef))
 
-        sql = "SELECT user_id, email FROM users WHERE user_id = %s;"
-        cur.execute(sql, (user_id,))
-        user = cur.fetchone()
+            sql = "SELECT user_id, email FROM users WHERE user_id = %s;"
+            cur.execute(sql, (user_id,), prepare=_PREPARE_HOT)
+            user = cur.fetchone()
 
-        cur.close()
-        conn.close()
+            cur.close()
+        _remember_user(_USER_BY_ID_CACHE, key, user, None)
         return user
     except Exception as e:
         print(f"Database Error on get_user_by_id: {e}")
@@ -1015,15 +1069,15 @@ def update_user_last_login(user_id: int) -> bool:
         True if successful, False otherwise
     """
     try:
-        conn = get_db_connection()
-        cur = conn.cursor()
+        with _pool_conn() as conn:
+            cur = conn.cursor()
 
-        sql = "UPDATE users SET last_login = NOW() WHERE user_id = %s;"
-        cur.execute(sql, (user_id,))
+            sql = "UPDATE users SET last_login = NOW() WHERE user_id = %s;"
+            cur.execute(sql, (user_id,))
 
-        conn.commit()
-        cur.close()
-        conn.close()
+            conn.commit()
+            cur.close()
+        invalidate_user(user_id)
         return True
     except Exception as e:
         print(f"Database Error on update_user_last_login: {e}")
@@ -1043,54 +1097,98 @@ def create_chat_session(user_id: int) -> Optional[str]:
         session_id (UUID string) if successful, None otherwise
     """
     try:
-        conn = get_db_connection()
-        cur = conn.cursor()
+        with _pool_conn() as conn:
+            cur = conn.cursor()
 
-        sql = "INSERT INTO chat_sessions (user_id) VALUES (%s) RETURNING session_id;"
-        cur.execute(sql, (user_id,))
-        session_id = cur.fetchone()[0]
+            sql = "INSERT INTO chat_sessions (user_id) VALUES (%s) RETURNING session_id;"
+            cur.execute(sql, (user_id,))
+            session_id = cur.fetchone()[0]
 
-        conn.commit()
-        cur.close()
-        conn.close()
+            conn.commit()
+            cur.close()
         return str(session_id)
     except Exception as e:
         print(f"Database Error on create_chat_session: {e}")
         return None
 
 
-def get_session_messages(session_id: str, limit: int = 50) -> list:
+# Keyset pagination: the cursor is the last row seen, compared on the full sort key
+# so a page never rescans or skips rows the way OFFSET would.
+_MESSAGES_AFTER = """
+        AND (created_at, message_id) > (
+            SELECT created_at, message_id FROM chat_messages WHERE message_id = %(after_id)s
+        )"""
+_SESSION_MESSAGES_SQL = {
+    paged: f"""
+        SELECT role, content, tool_calls, message_id
+        FROM chat_messages
+        WHERE session_id = %(session_id)s{_MESSAGES_AFTER if paged else ""}
+        ORDER BY created_at ASC, message_id ASC
+        LIMIT %(limit)s;
+    """
+    for paged in (True, False)
+}
+
+def get_session_messages(session_id: str, limit: int = 50, after_id: Optional[int] = None) -> list:
     """
     Retrieves messages from a chat session.
 
     Args:
         session_id: UUID of the chat session
         limit: Maximum number of messages to retrieve (default 50)
+        after_id: message_id of the last message already seen; pass it to get the next page
 
     Returns:
-        List of tuples (role, content, tool_calls) ordered oldest first
+        List of named tuples (role, content, tool_calls, message_id) ordered oldest first
     """
     try:
-        conn = get_db_connection()
-        cur = conn.cursor()
-
-        sql = """
-            SELECT role, content, tool_calls
-            FROM chat_messages
-            WHERE session_id = %s
-            ORDER BY created_at ASC
-            LIMIT %s;
-        """
-        cur.execute(sql, (session_id, limit))
-        messages = cur.fetchall()
-
-        cur.close()
-        conn.close()
+        with _readonly_conn() as conn:
+            cur = conn.cursor(row_factory=namedtuple_row)
+
+            params = {"session_id": session_id, "after_id": after_id, "limit": limit}
+            cur.execute(_SESSION_MESSAGES_SQL[after_id is not None], params)
+            messages = cur.fetchall()
+
+            cur.close()
         return messages
     except Exception as e:
         print(f"Database Error on get_session_messages: {e}")
         return []
 
+_ALL_SESSION_MESSAGES_SQL = """
+    SELECT role, content, tool_calls, message_id
+    FROM chat_messages
+    WHERE session_id = %s
+    ORDER BY created_at ASC, message_id ASC;
+"""
+
+def iter_session_messages(session_id: str, batch_size: int = 256) -> Iterator:
+    """
+    Streams a chat session's full history, oldest first, without loading it all into memory.
+
+    Uses a server-side cursor, so at most batch_size rows are held at a time. The pooled
+    connection stays checked out until the iteration finishes or the generator is closed.
+    On a database error it prints, as the other helpers do, and stops early.
+
+    Yields:
+        Named tuples (role, content, tool_calls, message_id), as get_session_messages returns
+    """
+    try:
+        with _readonly_conn() as conn:
+            cur = conn.cursor(name="session_messages", row_factory=namedtuple_row)
+            cur.itersize = batch_size
+            cur.execute(_ALL_SESSION_MESSAGES_SQL, (session_id,))
+
+            yield from cur
+
+            cur.close()
+    except Exception as e:
+        print(f"Database Error on iter_session_messages: {e}")
+
+_INSERT_MESSAGE_SQL = """
+    INSERT INTO chat_messages (session_id, role, content, tool_calls)
+    VALUES (%s, %s, %s, %s);
+"""
 
 def save_message(session_id: str, role: str, content: str, tool_calls: dict = None) -> bool:
     """
@@ -1106,53 +1204,91 @@ def save_message(session_id: str, role: str, content: str, tool_calls: dict = No
         True if successful, False otherwise
     """
     try:
-        import json
-
-        conn = get_db_connection()
-        cur = conn.cursor()
+        with _pool_conn() as conn:
+            cur = conn.cursor()
 
-        sql = """
-            INSERT INTO chat_messages (session_id, role, content, tool_calls)
-            VALUES (%s, %s, %s, %s);
-        """
-        cur.execute(sql, (session_id, role, content, json.dumps(tool_calls) if tool_calls else None))
+            # Jsonb sends the payload as a jsonb parameter instead of a pre-serialized text string
+            cur.execute(
+                _INSERT_MESSAGE_SQL,
+                (session_id, role, content, Jsonb(tool_calls) if tool_calls else None),
+                prepare=_PREPARE_HOT
+            )
 
-        conn.commit()
-        cur.close()
-        conn.close()
+            conn.commit()
+            cur.close()
         return True
     except Exception as e:
         print(f"Database Error on save_message: {e}")
         return False
 
 
-def get_user_sessions(user_id: int, limit: int = 10) -> list:
+def save_messages_bulk(session_id: str, rows: list) -> bool:
+    """
+    Saves several messages to a chat session in one round-trip, e.g. a whole agent turn.
+
+    Args:
+        session_id: UUID of the chat session
+        rows: (role, content, tool_calls) tuples in conversation order; tool_calls may be None
+
+    Returns:
+        True if successful, False otherwise
+    """
+    if not rows:
+        return True
+    try:
+        with _pool_conn() as conn:
+            cur = conn.cursor()
+
+            # executemany pipelines the inserts into one round-trip
+            cur.executemany(_INSERT_MESSAGE_SQL, [
+                (session_id, role, content, Jsonb(tool_calls) if tool_calls else None)
+                for role, content, tool_calls in rows
+            ])
+
+            conn.commit()
+            cur.close()
+        return True
+    except Exception as e:
+        print(f"Database Error on save_messages_bulk: {e}")
+        return False
+
+
+_SESSIONS_BEFORE = """
+        AND (updated_at, session_id) < (
+            SELECT updated_at, session_id FROM chat_sessions WHERE session_id = %(before_id)s
+        )"""
+_USER_SESSIONS_SQL = {
+    paged: f"""
+        SELECT session_id, created_at, updated_at
+        FROM chat_sessions
+        WHERE user_id = %(user_id)s{_SESSIONS_BEFORE if paged else ""}
+        ORDER BY updated_at DESC, session_id DESC
+        LIMIT %(limit)s;
+    """
+    for paged in (True, False)
+}
+
+def get_user_sessions(user_id: int, limit: int = 10, before_id: Optional[str] = None) -> list:
     """
     Retrieves recent chat sessions for a user.
 
     Args:
         user_id: User's database ID
         limit: Maximum number of sessions to retrieve (default 10)
+        before_id: session_id of the last session already seen; pass it to get the next page
 
     Returns:
-        List of tuples (session_id, created_at, updated_at)
+        List of tuples (session_id, created_at, updated_at), most recently active first
     """
     try:
-        conn = get_db_connection()
-        cur = conn.cursor()
-
-        sql = """
-            SELECT session_id, created_at, updated_at
-            FROM chat_sessions
-            WHERE user_id = %s
-            ORDER BY updated_at DESC
-            LIMIT %s;
-        """
-        cur.execute(sql, (user_id, limit))
-        sessions = cur.fetchall()
-
-        cur.close()
-        conn.close()
+        with _readonly_conn() as conn:
+            cur = conn.cursor()
+
+            params = {"user_id": user_id, "before_id": before_id, "limit": limit}
+            cur.execute(_USER_SESSIONS_SQL[before_id is not None], params)
+            sessions = cur.fetchall()
+
+            cur.close()
         return sessions
     except Exception as e:
         print(f"Database Error on get_user_sessions: {e}")
@@ -1161,6 +1297,16 @@ def get_user_sessions(user_id: int, limit: int = 10) -> list:
 
 # ===== TELEGRAM MIGRATION FUNCTIONS =====
 
+_MIGRATE_TELEGRAM_USER_SQL = """
+    WITH t AS (UPDATE transactions SET web_user_id = %(web)s WHERE user_id = %(tg)s),
+         b AS (UPDATE budgets SET web_user_id = %(web)s WHERE user_id = %(tg)s),
+         g AS (UPDATE goals SET web_user_id = %(web)s WHERE user_id = %(tg)s),
+         r AS (UPDATE recurring_expenses SET web_user_id = %(web)s WHERE user_id = %(tg)s)
+    INSERT INTO telegram_migrations (telegram_user_id, web_user_id, migrated_at)
+    VALUES (%(tg)s, %(web)s, NOW())
+    ON CONFLICT (telegram_user_id) DO NOTHING;
+"""
+
 def migrate_telegram_user_data(telegram_user_id: str, web_user_id: int) -> bool:
     """
     Transfers all data from a Telegram user to a web user account.
@@ -1174,31 +1320,19 @@ def migrate_telegram_user_data(telegram_user_id: str, web_user_id: int) -> bool:
         True if successful, False otherwise
     """
     try:
-        conn = get_db_connection()
-        cur = conn.cursor()
-
-        # Update all tables to point to the web user
-        tables = ['transactions', 'budgets', 'goals', 'recurring_expenses']
-        for table in tables:
-            sql = f"UPDATE {table} SET web_user_id = %s WHERE user_id = %s;"
-            cur.execute(sql, (web_user_id, telegram_user_id))
-
-        # Record the migration
-        sql = """
-            INSERT INTO telegram_migrations (telegram_user_id, web_user_id, migrated_at)
-            VALUES (%s, %s, NOW())
-            ON CONFLICT (telegram_user_id) DO NOTHING;
-        """
-        cur.execute(sql, (telegram_user_id, web_user_id))
-
-        conn.commit()
-        cur.close()
-        conn.close()
+        with _pool_conn() as conn:
+            cur = conn.cursor()
+
+            # Point all tables at the web user and record the migration in one statement
+            cur.execute(_MIGRATE_TELEGRAM_USER_SQL, {"tg": telegram_user_id, "web": web_user_id})
+
+            conn.commit()
+            cur.close()
+        _forget_budget(detect_user_type(telegram_user_id))
+        _forget_budget(detect_user_type(str(web_user_id)))
         return True
     except Exception as e:
         print(f"Database Error on migrate_telegram_user_data: {e}")
-        if conn:
-            conn.rollback()
         return False
 
 
@@ -1213,16 +1347,15 @@ def check_telegram_migration(telegram_user_id: str) -> Optional[int]:
         web_user_id if migrated, None otherwise
     """
     try:
-        conn = get_db_connection()
-        cur = conn.cursor()
+        with _readonly_conn() as conn:
+            cur = conn.cursor(row_factory=namedtuple_row)
 
-        sql = "SELECT web_user_id FROM telegram_migrations WHERE telegram_user_id = %s;"
-        cur.execute(sql, (telegram_user_id,))
-        result = cur.fetchone()
+            sql = "SELECT web_user_id FROM telegram_migrations WHERE telegram_user_id = %s;"
+            cur.execute(sql, (telegram_user_id,))
+            result = cur.fetchone()
 
-        cur.close()
-        conn.close()
-        return result[0] if result else None
+            cur.close()
+        return result.web_user_id if result else None
     except Exception as e:
         print(f"Database Error on check_telegram_migration: {e}")
         return None
\ No newline at end of file
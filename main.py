@@ -1,23 +1,28 @@
 import os
+import asyncio
+import threading
+import weakref
 import uvicorn
+from concurrent.futures import ThreadPoolExecutor
 from fastapi import FastAPI, HTTPException
 from pydantic import BaseModel
 from dotenv import load_dotenv
-from langchain_core.messages import HumanMessage
-from typing import Dict, Any
+from langchain_core.messages import HumanMessage, AIMessageChunk
+from cachetools import LRUCache
 
 # --- Telegram Bot Dependencies ---
 import telegram
 from telegram import Update
 from telegram.ext import Application, MessageHandler, filters
 from starlette.requests import Request
-from starlette.responses import JSONResponse
-import httpx 
+from starlette.responses import JSONResponse, StreamingResponse
 
 # Import the compiled LangGraph agent and state models
-from agent_graph import app
+from agent_graph import get_app
 from models.state import GraphState
 from models.budget import Budget
+from auth import close_http_client
+from db_manager import close_db_pool
 
 import os
 
@@ -30,8 +35,15 @@ app_fastapi = FastAPI(title="LangGraph Financial Assistant API")
 TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN") 
 
 # --- Initialize Global State and Budget ---
-# This is a temporary, in-memory dictionary for user-specific state persistence
-USER_AGENTS: Dict[str, Any] = {}
+# In-memory, per-thread agent state. Bounded so idle chats are evicted instead of
+# accumulating forever; an evicted chat simply starts a fresh conversation.
+AGENT_CACHE_SIZE = int(os.getenv("AGENT_CACHE_SIZE", "1024"))
+USER_AGENTS: LRUCache = LRUCache(maxsize=AGENT_CACHE_SIZE)
+_agents_lock = threading.Lock()  # prepare_turn runs in worker threads
+# One lock per thread_id, held for a whole turn: prepare_turn appends to the cached state
+# in place and the graph runs on it, so two turns of one chat must not overlap.
+# Weak values: a chat's lock is dropped as soon as no turn holds or waits on it.
+_turn_locks: "weakref.WeakValueDictionary[str, asyncio.Lock]" = weakref.WeakValueDictionary()
 DEFAULT_BUDGET = Budget(
     user_name="Kean",
     currency_symbol="₱",
@@ -46,42 +58,29 @@ class AgentRequest(BaseModel):
     thread_id: str 
 
 async def handle_message(update: Update, context):
-    """Processes the message from Telegram and calls the internal /api/chat endpoint."""
+    """Processes the message from Telegram by running the agent in-process."""
     if update.message and update.message.text and application:
         user_input = update.message.text
         chat_id = str(update.message.chat_id)
-        
-        # 1. Call the internal FastAPI endpoint
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            try:
-                response = await client.post(
-                    INTERNAL_API_URL, 
-                    json={"user_input": user_input, "thread_id": chat_id}
-                )
-                
-                if response.status_code == 200:
-                    api_response = response.json()
-                    final_text = api_response.get("response", "Sorry, I couldn't process that.")
-                else:
-                    final_text = f"Error: Agent API failed with status {response.status_code}."
 
-            except Exception as e:
-                print(f"Internal API Call Error: {e}")
-                final_text = "I'm sorry, I seem to be having trouble connecting to my brain right now."
-        
+        # 1. Run the agent for this chat
+        try:
+            final_text = await run_agent(user_input, chat_id)
+        except Exception as e:
+            print(f"Agent Error: {e}")
+            final_text = "I'm sorry, I seem to be having trouble connecting to my brain right now."
+
         # 2. Send the final response back to the user via Telegram
         await context.bot.send_message(chat_id=chat_id, text=final_text)
 
 # --- Agent Invocation Logic ---
-@app_fastapi.post("/api/chat")
-async def chat_endpoint(request: AgentRequest):
-    try:
-        thread_id = request.thread_id
-        user_input = request.user_input
-        
-        # 1. Initialize or Retrieve Agent State
-        if thread_id not in USER_AGENTS:
-            initial_state = GraphState(
+def prepare_turn(thread_id: str, user_input: str) -> GraphState:
+    """Loads the user's state, runs due recurring expenses and appends the new message."""
+    # 1. Initialize or Retrieve Agent State
+    with _agents_lock:
+        current_state = USER_AGENTS.get(thread_id)
+        if current_state is None:
+            current_state = GraphState(
                 thread_id=thread_id,
                 messages=[],
                 tool_calls=[],
@@ -89,45 +88,102 @@ async def chat_endpoint(request: AgentRequest):
                 intent="",
                 budget=DEFAULT_BUDGET
             )
-            USER_AGENTS[thread_id] = initial_state
+            USER_AGENTS[thread_id] = current_state
 
-        current_state = USER_AGENTS[thread_id]
+    # === NEW: AUTO-PROCESS RECURRING EXPENSES ===
+    from db_manager import process_due_recurring_expenses_db
+    count, message = process_due_recurring_expenses_db(thread_id)
 
-        # === NEW: AUTO-PROCESS RECURRING EXPENSES ===
-        from db_manager import process_due_recurring_expenses_db
-        count, message = process_due_recurring_expenses_db(thread_id)
+    if count > 0:
+        # Inject system notification into conversation
+        notification = (f"🔔 Auto-processed {count} recurring expense(s). "
+                      f"You MUST use check_budget to inform the user.")
+        current_state['messages'].append(
+            HumanMessage(content=f"[SYSTEM]: {notification}")
+        )
+        print(f"Auto-processed {count} recurring expenses for user {thread_id}")
+    # ============================================
 
-        if count > 0:
-            # Inject system notification into conversation
-            notification = (f"🔔 Auto-processed {count} recurring expense(s). "
-                          f"You MUST use check_budget to inform the user.")
-            current_state['messages'].append(
-                HumanMessage(content=f"[SYSTEM]: {notification}")
-            )
-            print(f"Auto-processed {count} recurring expenses for user {thread_id}")
-        # ============================================
+    # 2. Append the new HumanMessage
+    current_state['messages'].append(HumanMessage(content=user_input))
+    return current_state
 
-        # 2. Append the new HumanMessage
-        current_state['messages'].append(HumanMessage(content=user_input))
+
+def turn_lock(thread_id: str) -> asyncio.Lock:
+    """Returns the lock serializing turns for thread_id (called on the event loop only)."""
+    lock = _turn_locks.get(thread_id)
+    if lock is None:
+        lock = _turn_locks[thread_id] = asyncio.Lock()
+    return lock
+
+
+async def run_agent(user_input: str, thread_id: str) -> str:
+    """Runs one agent turn for thread_id and returns the assistant's reply."""
+    async with turn_lock(thread_id):
+        current_state = await asyncio.to_thread(prepare_turn, thread_id, user_input)
 
         # 3. Invoke the compiled LangGraph app
-        final_state = app.invoke(current_state)
+        final_state = await get_app().ainvoke(current_state)
 
         # 4. Save the final state back to the user's slot
-        USER_AGENTS[thread_id] = final_state
-        
-        # 5. Extract the final response text
-        final_message = final_state['messages'][-1].content
-        
-        print(f"User {thread_id} processed. Final response: {final_message[:50]}...")
+        with _agents_lock:
+            USER_AGENTS[thread_id] = final_state
+
+    # 5. Extract the final response text
+    final_message = final_state['messages'][-1].content
+
+    print(f"User {thread_id} processed. Final response: {final_message[:50]}...")
+    return final_message
 
-        return {"thread_id": thread_id, "response": final_message}
+
+@app_fastapi.post("/api/chat")
+async def chat_endpoint(request: AgentRequest):
+    try:
+        final_message = await run_agent(request.user_input, request.thread_id)
+        return {"thread_id": request.thread_id, "response": final_message}
 
     except Exception as e:
         print(f"An error occurred in /api/chat: {e}")
         raise HTTPException(status_code=500, detail="Internal agent processing error.")
 
 
+@app_fastapi.post("/api/chat/stream")
+async def chat_stream_endpoint(request: AgentRequest):
+    """Same as /api/chat, but streams the assistant's reply as plain text while it is generated."""
+    thread_id = request.thread_id
+
+    async def token_stream():
+        final_state = None
+        streamed = False
+        # The turn lock is taken inside the generator so it is always released with it;
+        # errors after this point (prepare_turn included) are reported in-band
+        async with turn_lock(thread_id):
+            try:
+                current_state = await asyncio.to_thread(prepare_turn, thread_id, request.user_input)
+                async for mode, payload in get_app().astream(current_state, stream_mode=["messages", "values"]):
+                    if mode == "values":
+                        final_state = payload
+                        continue
+                    chunk, metadata = payload
+                    # Only forward planner text; tool-call chunks carry no user-facing content
+                    if metadata.get("langgraph_node") == "planner" and isinstance(chunk, AIMessageChunk) and chunk.content:
+                        streamed = True
+                        yield chunk.content
+            except Exception as e:
+                print(f"An error occurred in /api/chat/stream: {e}")
+                yield "\n[Internal agent processing error.]"
+                return
+
+            if final_state is not None:
+                with _agents_lock:
+                    USER_AGENTS[thread_id] = final_state
+        # Cached answers are not generated token by token; send them whole
+        if final_state is not None and not streamed:
+            yield final_state['messages'][-1].content
+
+    return StreamingResponse(token_stream(), media_type="text/plain; charset=utf-8")
+
+
 # --- Telegram Bot Setup (FIXED SCOPE) ---
 
 if TELEGRAM_BOT_TOKEN:
@@ -137,12 +193,6 @@ else:
     application = None
 
 
-if application:
-    application.add_handler(MessageHandler(filters.TEXT & (~filters.COMMAND), handle_message))
-
-
-
-
 # Register the handler only if the application object was successfully initialized
 if application:
     application.add_handler(MessageHandler(filters.TEXT & (~filters.COMMAND), handle_message))
@@ -167,9 +217,18 @@ async def telegram_webhook(request: Request):
 
 # In main.py, add this code block after the @app_fastapi.post("/webhook") function
 
+# Worker threads for asyncio.to_thread (prepare_turn, the DB-backed tools, user lookups).
+# The default executor caps at min(32, cpus + 4), which a small container hits quickly.
+THREAD_POOL_SIZE = int(os.getenv("THREAD_POOL_SIZE", "64"))
+
+
 @app_fastapi.on_event("startup")
 async def startup_event():
-    """Initializes the Telegram application asynchronously when FastAPI starts."""
+    """Sizes the worker thread pool and initializes the Telegram application when FastAPI starts."""
+    asyncio.get_running_loop().set_default_executor(
+        ThreadPoolExecutor(max_workers=THREAD_POOL_SIZE, thread_name_prefix="agent-worker")
+    )
+
     if application:
         try:
             # We must await the initialize call since it's an async function
@@ -179,9 +238,15 @@ async def startup_event():
             print(f"ERROR: Failed to initialize Telegram application: {e}")
 
 
+@app_fastapi.on_event("shutdown")
+async def shutdown_event():
+    """Closes the shared OAuth HTTP client's and the database's pooled connections."""
+    await close_http_client()
+    await asyncio.to_thread(close_db_pool)
+
+
 # --- Server Run Command ---
 PORT = int(os.getenv("PORT", 8080))
-INTERNAL_API_URL = f"http://127.0.0.1:{PORT}/api/chat"
 
 if __name__ == "__main__":
     uvicorn.run(app_fastapi, host="0.0.0.0", port=PORT)
\ No newline at end of file
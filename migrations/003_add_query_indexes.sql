@@ -0,0 +1,18 @@
+-- Migration 003: Covering indexes for the hot transaction and recurring-expense reads
+-- Spending sums, expenses-by-date and the weekly breakdown all filter on
+-- (user_id or web_user_id) AND expense_date; INCLUDE lets them run as index-only scans.
+--
+-- Not CONCURRENTLY: run_migration.py executes each file inside one transaction.
+-- On a large live table, run these statements manually with CONCURRENTLY instead.
+
+CREATE INDEX IF NOT EXISTS idx_transactions_user_date
+    ON transactions(user_id, expense_date) INCLUDE (amount, category, description);
+
+CREATE INDEX IF NOT EXISTS idx_transactions_web_user_date
+    ON transactions(web_user_id, expense_date) INCLUDE (amount, category, description)
+    WHERE web_user_id IS NOT NULL;
+
+-- Due-expense scan in process_due_recurring_expenses_db (is_active = TRUE AND next_occurrence <= today)
+CREATE INDEX IF NOT EXISTS idx_recurring_due
+    ON recurring_expenses(next_occurrence)
+    WHERE is_active = TRUE;
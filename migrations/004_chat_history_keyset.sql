@@ -0,0 +1,13 @@
+-- Migration 004: Index for keyset pagination of chat history
+-- get_session_messages pages on (created_at, message_id) within a session; this index
+-- serves both the first page and every "after" page without sorting or OFFSET scans.
+-- It also covers plain session_id lookups, so the single-column index is dropped.
+--
+-- chat_sessions is deliberately left on idx_chat_sessions_user_id: the chat_messages
+-- trigger bumps updated_at on every insert, and indexing that column would turn each of
+-- those updates into a non-HOT update. A user's sessions are few enough to sort in memory.
+
+CREATE INDEX IF NOT EXISTS idx_chat_messages_session_created
+    ON chat_messages(session_id, created_at, message_id);
+
+DROP INDEX IF EXISTS idx_chat_messages_session_id;
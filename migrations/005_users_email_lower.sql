@@ -0,0 +1,11 @@
+-- Migration 005: Case-insensitive email lookups
+-- get_user_by_email matches on lower(email); this unique index backs that lookup and
+-- stops "User@x.com" and "user@x.com" from becoming two accounts.
+-- If this fails with a unique violation, merge the users whose emails differ only in case first.
+--
+-- Not CONCURRENTLY: run_migration.py executes each file inside one transaction.
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_users_email_lower ON users(lower(email));
+
+-- Duplicate of the users_email_key index behind the UNIQUE (email) constraint
+DROP INDEX IF EXISTS idx_users_email;
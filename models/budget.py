@@ -1,8 +1,12 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 from typing import Dict
 
 class Budget(BaseModel):
     """Schema for managing daily and weekly budgets and user preferences."""
+
+    # One DEFAULT_BUDGET instance is shared by reference across every user's state,
+    # so it is read-only; validation only runs once, when it is constructed.
+    model_config = ConfigDict(frozen=True)
     
     # Stores the daily budget limit for various categories. Default is an empty dictionary.
     daily_limits: Dict[str, float] = Field(default_factory=dict, 
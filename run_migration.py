@@ -4,78 +4,113 @@ Executes SQL migration files against the configured database.
 """
 
 import os
-import psycopg2
-from dotenv import load_dotenv
-
-# Load environment variables
-load_dotenv()
+import sys
+import glob
+import logging
+import logging.handlers
+import psycopg
+from config import DATABASE_URL
+
+logger = logging.getLogger(__name__)
+
+# Bookkeeping table: one row per migration file that has been applied
+CREATE_SCHEMA_MIGRATIONS_SQL = """
+    CREATE TABLE IF NOT EXISTS schema_migrations (
+        script TEXT PRIMARY KEY,
+        applied_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+    );
+"""
 
-DATABASE_URL = os.getenv("DATABASE_URL")
+def load_applied_migrations(conn) -> set:
+    """Creates schema_migrations if needed and returns the applied script names in one query."""
+    cur = conn.cursor()
+    cur.execute(CREATE_SCHEMA_MIGRATIONS_SQL)
+    cur.execute("SELECT script FROM schema_migrations;")
+    applied = {row[0] for row in cur.fetchall()}
+    cur.close()
+    return applied
+
+def run_migration(conn, migration_file: str, applied: set) -> bool:
+    """
+    Execute a migration SQL file on an open connection, unless it is already applied.
+
+    Each file runs under its own savepoint, so a failed or already-applied file is
+    undone without discarding the ones before it. The caller commits.
+    """
+    script = os.path.basename(migration_file)
+    if script in applied:
+        logger.info("[SKIP] Already applied: %s", script)
+        return True
 
-def run_migration(migration_file: str):
-    """Execute a migration SQL file."""
-    print(f"\n{'='*60}")
-    print(f"Running migration: {migration_file}")
-    print(f"{'='*60}\n")
+    logger.info("\n%s\nRunning migration: %s\n%s\n", "="*60, migration_file, "="*60)
 
-    if not DATABASE_URL:
-        print("[ERROR] DATABASE_URL not found in environment variables")
-        return False
+    # Read migration file as bytes: psycopg sends them as-is, with no str decode/encode round trip
+    with open(migration_file, 'rb') as f:
+        sql = f.read()
 
-    conn = None
+    cur = conn.cursor()
     try:
-        # Read migration file
-        with open(migration_file, 'r') as f:
-            sql = f.read()
-
-        # Connect to database
-        print("Connecting to database...")
-        conn = psycopg2.connect(DATABASE_URL)
-        cur = conn.cursor()
+        cur.execute("SAVEPOINT migration;")
 
-        # Execute migration
-        print("Executing SQL commands...")
+        # Execute migration: the whole file goes to the server as one batch
+        logger.info("Executing SQL commands...")
         cur.execute(sql)
 
-        # Commit changes
-        conn.commit()
-        print("[SUCCESS] Migration completed successfully!")
-
-        # Close connection
-        cur.close()
-        conn.close()
-
-        return True
+        cur.execute("RELEASE SAVEPOINT migration;")
+        logger.info("[SUCCESS] Migration completed successfully!")
 
-    except psycopg2.errors.DuplicateTable as e:
-        print(f"[WARNING] Tables already exist (skipping): {e}")
-        if conn:
-            conn.rollback()
-        return True
+    except psycopg.errors.DuplicateTable as e:
+        # Applied before schema_migrations existed; record it so it's skipped from now on
+        logger.warning("[WARNING] Tables already exist (skipping): %s", e)
+        cur.execute("ROLLBACK TO SAVEPOINT migration;")
 
     except Exception as e:
-        print(f"[ERROR] Migration failed: {e}")
-        if conn:
-            conn.rollback()
+        logger.error("[ERROR] Migration failed: %s", e)
+        cur.execute("ROLLBACK TO SAVEPOINT migration;")
+        cur.close()
         return False
 
+    cur.execute("INSERT INTO schema_migrations (script) VALUES (%s);", (script,))
+    cur.close()
+    applied.add(script)
+    return True
+
 
 if __name__ == "__main__":
-    # Run the auth migration
-    migration_path = "migrations/002_create_users_auth.sql"
+    # Buffer progress lines and write them out in one go; an ERROR record, a full buffer
+    # or the exit-time logging.shutdown() flushes early, so nothing is lost on failure
+    output = logging.handlers.MemoryHandler(capacity=1024, target=logging.StreamHandler(sys.stdout))
+    output.target.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(output)
+    logger.setLevel(logging.INFO)
 
-    if not os.path.exists(migration_path):
-        print(f"[ERROR] Migration file not found: {migration_path}")
+    if not DATABASE_URL:
+        logger.error("[ERROR] DATABASE_URL not found in environment variables")
         exit(1)
 
-    success = run_migration(migration_path)
+    migration_paths = sorted(glob.glob("migrations/*.sql"))
+    if not migration_paths:
+        logger.error("[ERROR] No migration files found in migrations/")
+        exit(1)
+
+    # One connection and one transaction for every file: nothing is committed unless all succeed
+    logger.info("Connecting to database...")
+    conn = psycopg.connect(DATABASE_URL)
+    try:
+        # Migration-only: don't wait on the WAL flush at COMMIT. A crash can at worst lose the
+        # whole batch, schema_migrations rows included, so a rerun simply applies it again.
+        conn.execute("SET LOCAL synchronous_commit = off;")
+        applied = load_applied_migrations(conn)
+        success = all(run_migration(conn, path, applied) for path in migration_paths)
+        if success:
+            conn.commit()
+        else:
+            conn.rollback()
+    finally:
+        conn.close()
 
     if success:
-        print("\n" + "="*60)
-        print("[SUCCESS] All migrations completed successfully!")
-        print("="*60)
+        logger.info("\n%s\n[SUCCESS] All migrations completed successfully!\n%s", "="*60, "="*60)
     else:
-        print("\n" + "="*60)
-        print("[ERROR] Migration failed. Check the errors above.")
-        print("="*60)
+        logger.error("\n%s\n[ERROR] Migration failed. Check the errors above.\n%s", "="*60, "="*60)
         exit(1)
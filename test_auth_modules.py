@@ -14,22 +14,27 @@ print("="*60)
 print("\n[TEST 1] Password Hashing Module")
 print("-" * 40)
 try:
-    from passlib.context import CryptContext
-    pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=12)
+    # Exercise the application's shared context rather than building a separate one
+    from auth.password import verify_password, needs_rehash
 
-    # Hash a password (keep it under 72 bytes for bcrypt)
+    # Pre-computed once with hash_password(); verifying it alone skips a KDF run per test
+    KNOWN_HASH = "$argon2id$v=19$m=19456,t=2,p=1$vhcCoHSOcQ4h5FzL+Z/zXg$jOG4coN/2wzwLGBVix3hxArgEwLS5M0wOaQ2nORwrZ0"
     test_password = "SecurePass123!"
-    hashed = pwd_context.hash(test_password)
+    hashed = KNOWN_HASH
     print(f"Password: {test_password}")
     print(f"Hashed:   {hashed[:60]}...")  # Show first 60 chars
 
+    # needs_rehash() is a parameter comparison, no KDF: False means the constant
+    # still matches the context's current argon2 settings
+    assert not needs_rehash(hashed), "KNOWN_HASH is stale; regenerate it with hash_password()"
+
     # Verify correct password
-    is_valid = pwd_context.verify(test_password, hashed)
+    is_valid = verify_password(test_password, hashed)
     print(f"Verify correct password: {is_valid}")
     assert is_valid, "Correct password should verify"
 
     # Verify wrong password
-    is_invalid = pwd_context.verify("WrongPassword", hashed)
+    is_invalid = verify_password("WrongPassword", hashed)
     print(f"Verify wrong password: {is_invalid}")
     assert not is_invalid, "Wrong password should not verify"
 
@@ -75,15 +80,12 @@ except Exception as e:
 print("\n[TEST 3] OAuth Module")
 print("-" * 40)
 try:
-    # Set test env vars BEFORE importing
-    os.environ["GOOGLE_CLIENT_ID"] = "test-client-id"
-    os.environ["GOOGLE_REDIRECT_URI"] = "http://localhost:3000/auth/callback"
-
-    # Now import after env vars are set
-    import importlib
-    import auth.oauth as oauth_module
-    importlib.reload(oauth_module)  # Reload to pick up new env vars
-    from auth.oauth import get_google_auth_url
+    # Inject test settings directly instead of setting env vars and reloading the module
+    from auth.oauth import OAuthConfig, configure, get_google_auth_url
+    configure(OAuthConfig(
+        client_id="test-client-id",
+        redirect_uri="http://localhost:3000/auth/callback",
+    ))
 
     auth_url = get_google_auth_url()
     print(f"Google Auth URL: {auth_url[:80]}...")
@@ -100,20 +102,14 @@ except Exception as e:
 print("\n[TEST 4] Redis Client (graceful fallback)")
 print("-" * 40)
 try:
-    # Import redis client (it will print warnings about connection)
-    import sys
-    import io
+    # Import redis client (it logs warnings about the connection)
+    import logging
 
-    # Capture stdout to suppress emoji warnings
-    old_stdout = sys.stdout
-    sys.stdout = io.StringIO()
+    # Silence the client's connection warnings at the logger, before any message is formatted
+    logging.getLogger("cache.redis_client").setLevel(logging.CRITICAL)
 
     from cache.redis_client import blacklist_jwt, is_jwt_blacklisted, REDIS_AVAILABLE
 
-    # Restore stdout
-    output = sys.stdout.getvalue()
-    sys.stdout = old_stdout
-
     print(f"Redis Available: {REDIS_AVAILABLE}")
 
     # These should fail gracefully without Redis
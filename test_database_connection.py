@@ -3,18 +3,13 @@ Quick test script to verify database connection.
 Run this after updating your DATABASE_URL in .env
 """
 
-import os
-import psycopg2
-from dotenv import load_dotenv
+import psycopg
+from config import DATABASE_URL, MASKED_DB_URL
 
 print("="*60)
 print("Database Connection Test")
 print("="*60)
 
-# Load environment variables
-load_dotenv()
-DATABASE_URL = os.getenv("DATABASE_URL")
-
 # Test 1: Check if DATABASE_URL exists
 print("\n[TEST 1] Checking .env configuration...")
 if not DATABASE_URL:
@@ -24,52 +19,50 @@ if not DATABASE_URL:
     exit(1)
 else:
     print("[PASS] DATABASE_URL found in .env")
-    # Show partial URL for verification (hide password)
-    if "@" in DATABASE_URL:
-        parts = DATABASE_URL.split("@")
-        user_part = parts[0].split(":")
-        if len(user_part) >= 2:
-            masked = f"{user_part[0]}:****@{parts[1]}"
-        else:
-            masked = f"****@{parts[1]}"
-        print(f"       URL: {masked}")
+    # Show the URL for verification, with the password hidden
+    print(f"       URL: {MASKED_DB_URL}")
 
 # Test 2: Try to connect
 print("\n[TEST 2] Testing database connection...")
 try:
-    conn = psycopg2.connect(DATABASE_URL)
+    conn = psycopg.connect(DATABASE_URL)
     print("[PASS] Successfully connected to database!")
 
     # Test 3: Check database info
+    # Version, database name, the table list and the missing auth tables come back
+    # in one round-trip; the missing-table check runs server-side
     print("\n[TEST 3] Checking database info...")
+    auth_tables = ['users', 'chat_sessions', 'chat_messages']
     cur = conn.cursor()
-    cur.execute("SELECT version();")
-    version = cur.fetchone()[0]
+    cur.execute("""
+        SELECT version(),
+               current_database(),
+               ARRAY(
+                   SELECT table_name::text
+                   FROM information_schema.tables
+                   WHERE table_schema = 'public'
+                   ORDER BY table_name
+               ),
+               ARRAY(
+                   SELECT t.name
+                   FROM unnest(%s::text[]) WITH ORDINALITY AS t(name, pos)
+                   WHERE t.name NOT IN (
+                       SELECT table_name FROM information_schema.tables WHERE table_schema = 'public'
+                   )
+                   ORDER BY t.pos
+               );
+    """, (auth_tables,))
+    version, db_name, tables, missing_auth_tables = cur.fetchone()
     print(f"[PASS] PostgreSQL Version: {version.split(',')[0]}")
-
-    cur.execute("SELECT current_database();")
-    db_name = cur.fetchone()[0]
     print(f"[PASS] Database Name: {db_name}")
 
     # Test 4: Check if auth tables exist
     print("\n[TEST 4] Checking for existing tables...")
-    cur.execute("""
-        SELECT table_name
-        FROM information_schema.tables
-        WHERE table_schema = 'public'
-        ORDER BY table_name;
-    """)
-    tables = cur.fetchall()
 
     if tables:
         print(f"[INFO] Found {len(tables)} existing tables:")
         for table in tables:
-            print(f"       - {table[0]}")
-
-        # Check if auth tables exist
-        table_names = [t[0] for t in tables]
-        auth_tables = ['users', 'chat_sessions', 'chat_messages']
-        missing_auth_tables = [t for t in auth_tables if t not in table_names]
+            print(f"       - {table}")
 
         if missing_auth_tables:
             print(f"\n[INFO] Auth tables need to be created: {', '.join(missing_auth_tables)}")
@@ -87,11 +80,11 @@ try:
     print("[SUCCESS] Database connection is working!")
     print("="*60)
     print("\nNext steps:")
-    if not tables or 'users' not in [t[0] for t in tables]:
+    if 'users' in missing_auth_tables:
         print("1. Run database migration: python run_migration.py")
     print("2. Continue with webapp development")
 
-except psycopg2.OperationalError as e:
+except psycopg.OperationalError as e:
     error_msg = str(e)
     print(f"[FAIL] Connection failed: {error_msg}")
     print("\n" + "="*60)
@@ -2,9 +2,13 @@
 Test the new database authentication functions.
 """
 
+import os
 import db_manager
 import bcrypt
 
+# bcrypt cost for the test user's hash; 4 is the minimum and keeps the script fast
+BCRYPT_ROUNDS = int(os.environ.get("BCRYPT_TEST_ROUNDS", 4))
+
 print("="*60)
 print("Testing New Database Functions")
 print("="*60)
@@ -14,7 +18,7 @@ print("\n[TEST 1] Creating test user...")
 try:
     test_email = "test@example.com"
     # Hash password with bcrypt directly
-    test_password = bcrypt.hashpw(b"TestPass123", bcrypt.gensalt()).decode('utf-8')
+    test_password = bcrypt.hashpw(b"TestPass123", bcrypt.gensalt(rounds=BCRYPT_ROUNDS)).decode('utf-8')
 
     user_id = db_manager.create_user(test_email, test_password)
     if user_id:
@@ -35,6 +39,21 @@ try:
 except Exception as e:
     print(f"[FAIL] {e}")
 
+# Test 2b: A case variant of the email must resolve to the same account
+print("\n[TEST 2b] Get-or-create with a case-variant email...")
+try:
+    result = db_manager.get_or_create_user("TEST@Example.com", google_id="google-test-id")
+    if user and result == (user[0], False):
+        linked = db_manager.get_user_by_email("test@example.com")
+        if linked and linked.google_id == "google-test-id":
+            print(f"[PASS] Matched existing user {result[0]} and filled in google_id")
+        else:
+            print(f"[FAIL] google_id not filled in: {linked}")
+    else:
+        print(f"[FAIL] Expected ({user[0] if user else None}, False), got {result}")
+except Exception as e:
+    print(f"[FAIL] {e}")
+
 # Test 3: Create chat session
 print("\n[TEST 3] Creating chat session...")
 try:
@@ -45,9 +64,11 @@ try:
 
             # Test 4: Save message
             print("\n[TEST 4] Saving messages...")
-            db_manager.save_message(session_id, "human", "Hello, bot!")
-            db_manager.save_message(session_id, "ai", "Hello! How can I help you?")
-            print("[PASS] Messages saved")
+            saved = db_manager.save_messages_bulk(session_id, [
+                ("human", "Hello, bot!", None),
+                ("ai", "Hello! How can I help you?", None),
+            ])
+            print("[PASS] Messages saved" if saved else "[FAIL] Failed to save messages")
 
             # Test 5: Retrieve messages
             print("\n[TEST 5] Retrieving messages...")
@@ -66,24 +87,22 @@ except Exception as e:
 # Clean up test data
 print("\n[CLEANUP] Removing test data...")
 try:
-    import psycopg2
-    from dotenv import load_dotenv
-    import os
-
-    load_dotenv()
-    conn = psycopg2.connect(os.getenv("DATABASE_URL"))
-    cur = conn.cursor()
-
-    # Delete test user and related data (CASCADE will delete sessions/messages)
-    cur.execute("DELETE FROM users WHERE email = %s", ("test@example.com",))
-    conn.commit()
-
-    cur.close()
-    conn.close()
+    # Borrow from db_manager's pool: the connection the tests above used is already open
+    conn = db_manager.get_db_connection()
+    try:
+        # Delete test user and related data (CASCADE will delete sessions/messages)
+        conn.execute("DELETE FROM users WHERE email = %s", ("test@example.com",))
+        conn.commit()
+    finally:
+        db_manager.release_db_connection(conn)
+    db_manager.invalidate_user(email="test@example.com")
     print("[PASS] Test data cleaned up")
 except Exception as e:
     print(f"[WARN] Cleanup failed: {e}")
 
+# Every step above reused the same pooled connection; close it now that we're done
+db_manager.close_db_pool()
+
 print("\n" + "="*60)
 print("[SUCCESS] All database functions working!")
 print("="*60)